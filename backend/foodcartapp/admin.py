@@ -5,6 +5,12 @@ from django.templatetags.static import static
 from django.utils.html import format_html
 from django.utils.http import url_has_allowed_host_and_scheme
 
+from star_burger.db_router import replica_reads
+
+from .models import ArchivedDelivery
+from .models import ArchivedOrder
+from .models import ArchivedOrderKit
+from .models import DeliveryJob
 from .models import Order
 from .models import Product
 from .models import ProductCategory
@@ -33,6 +39,12 @@ class RestaurantAdmin(admin.ModelAdmin):
         RestaurantMenuItemInline
     ]
 
+    def save_model(self, request, obj, form, change):
+        if 'address' in form.changed_data or obj.get_coordinates() is None:
+            obj.geocode()
+
+        super().save_model(request, obj, form, change)
+
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
@@ -129,21 +141,27 @@ class OrderAdmin(admin.ModelAdmin):
         'firstname',
         'address',
     ]
+    readonly_fields = [
+        'geocoding_status',
+        'lat',
+        'lon',
+        'geocoded_at',
+    ]
 
     def get_form(self, request, obj=None, **kwargs):
         form = super().get_form(request, obj, **kwargs)
 
         form.base_fields['preparing_restaurant'].queryset = Restaurant.objects.filter(
             deliveries__order=obj,
-            name__in=obj.get_verified_restaurants()
+            deliveries__can_fulfil=True,
         ).order_by('deliveries__distance')
 
         return form
 
     def save_formset(self, request, form, formset, change):
         if 'address' in form.changed_data:
-            for delivery in form.instance.deliveries.iterator():
-                delivery.add_distance()
+            form.instance.reset_coordinates()
+            DeliveryJob.enqueue(form.instance)
 
         if changed_kits := formset.save(commit=False):
             for changed_kit in changed_kits:
@@ -159,3 +177,77 @@ class OrderAdmin(admin.ModelAdmin):
              return HttpResponseRedirect(request.GET['next'])
         else:
             return response
+
+
+@admin.register(DeliveryJob)
+class DeliveryJobAdmin(admin.ModelAdmin):
+    list_display = [
+        'order',
+        'status',
+        'attempts',
+        'run_after',
+        'updated_at',
+    ]
+    list_filter = [
+        'status',
+    ]
+    raw_id_fields = [
+        'order',
+    ]
+    readonly_fields = [
+        'error',
+        'updated_at',
+    ]
+
+
+class ReadOnlyAdminMixin:
+    def has_add_permission(self, request, obj=None):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+class ArchivedOrderKitInline(ReadOnlyAdminMixin, admin.TabularInline):
+    model = ArchivedOrderKit
+    extra = 0
+
+
+class ArchivedDeliveryInline(ReadOnlyAdminMixin, admin.TabularInline):
+    model = ArchivedDelivery
+    extra = 0
+
+
+@admin.register(ArchivedOrder)
+class ArchivedOrderAdmin(ReadOnlyAdminMixin, admin.ModelAdmin):
+    inlines = [
+        ArchivedOrderKitInline,
+        ArchivedDeliveryInline,
+    ]
+    list_display = [
+        'id',
+        'phonenumber',
+        'firstname',
+        'address',
+        'price',
+        'registered_at',
+        'archived_at',
+    ]
+    list_filter = [
+        'payment',
+        'preparing_restaurant',
+    ]
+    search_fields = [
+        '=id',
+        'phonenumber',
+        'address',
+    ]
+    date_hierarchy = 'registered_at'
+    show_full_result_count = False
+
+    def changelist_view(self, request, extra_context=None):
+        with replica_reads():
+            return super().changelist_view(request, extra_context)
@@ -0,0 +1,123 @@
+import threading
+
+from django.db import transaction
+
+from .versions import bump_version, get_version
+
+
+class AvailabilityIndex:
+    """
+    Битовая матрица наличия продуктов в ресторанах: каждому продукту выдаётся номер бита,
+    а каждому ресторану — число, в котором выставлены биты продуктов в продаже.
+    """
+
+    def __init__(self, menu_items: list[tuple[int, int, bool]] = ()):
+        self.products_bits = {}
+        self.restaurants_masks = {}
+
+        for restaurant_id, product_id, availability in menu_items:
+            self.set(restaurant_id, product_id, availability)
+
+    def get_bit(self, product_id: int) -> int:
+        if product_id not in self.products_bits:
+            self.products_bits[product_id] = 1 << len(self.products_bits)
+
+        return self.products_bits[product_id]
+
+    def get_mask(self, products_ids) -> int:
+        mask = 0
+        for product_id in products_ids:
+            mask |= self.get_bit(product_id)
+
+        return mask
+
+    def set(self, restaurant_id: int, product_id: int, availability: bool) -> None:
+        mask = self.restaurants_masks.get(restaurant_id, 0)
+        bit = self.get_bit(product_id)
+
+        self.restaurants_masks[restaurant_id] = mask | bit if availability else mask & ~bit
+
+    def is_available(self, restaurant_id: int, product_id: int) -> bool:
+        return bool(self.restaurants_masks.get(restaurant_id, 0) & self.products_bits.get(product_id, 0))
+
+    def get_available_products_ids(self, products_ids=None) -> list[int]:
+        """
+        Функция возвращает id продуктов, которые есть в продаже хотя бы в одном ресторане:
+        всех или только из products_ids.
+        """
+        mask = 0
+        for restaurant_mask in self.restaurants_masks.values():
+            mask |= restaurant_mask
+
+        if products_ids is None:
+            return [product_id for product_id, bit in self.products_bits.items() if mask & bit]
+
+        return [product_id for product_id in products_ids if mask & self.products_bits.get(product_id, 0)]
+
+    def get_availability(self, product_id: int, restaurants_ids: list[int]) -> list[bool]:
+        bit = self.products_bits.get(product_id, 0)
+
+        return [bool(self.restaurants_masks.get(restaurant_id, 0) & bit) for restaurant_id in restaurants_ids]
+
+    def get_restaurants_ids(self, products_ids) -> list[int]:
+        """
+        Функция возвращает id ресторанов, в которых есть в продаже все продукты products_ids.
+        """
+        mask = self.get_mask(products_ids)
+
+        return [
+            restaurant_id
+            for restaurant_id, restaurant_mask in self.restaurants_masks.items()
+            if restaurant_mask & mask == mask
+        ]
+
+
+_index = None
+_index_version = None
+_index_lock = threading.RLock()
+
+
+def build_availability_index() -> AvailabilityIndex:
+    from .models import RestaurantMenuItem
+
+    # Индекс живёт до смены версии, поэтому строится по основной БД, а не по отстающей реплике.
+    menu_items = RestaurantMenuItem.objects.using('default').values_list('restaurant_id', 'product_id', 'availability')
+
+    return AvailabilityIndex(menu_items.iterator())
+
+
+def get_availability_index() -> AvailabilityIndex:
+    """
+    Функция возвращает индекс наличия продуктов текущего процесса.
+    Если версия 'availability' в БД сменилась в другом процессе, индекс строится заново.
+    """
+    global _index, _index_version
+
+    version = get_version('availability')
+
+    with _index_lock:
+        if _index is None or _index_version != version:
+            _index = build_availability_index()
+            _index_version = version
+
+        return _index
+
+
+def update_availability(restaurant_id: int, product_id: int, availability: bool) -> None:
+    """
+    Функция после коммита транзакции меняет версию, чтобы остальные процессы перестроили
+    свои индексы. Индекс текущего процесса обновляется на месте, только если между его
+    версией и новой никто больше меню не менял, иначе он тоже будет построен заново.
+    """
+    def update():
+        global _index_version
+
+        with _index_lock:
+            index = get_availability_index()
+            version = bump_version('availability')
+
+            if version == _index_version + 1:
+                index.set(restaurant_id, product_id, availability)
+                _index_version = version
+
+    transaction.on_commit(update)
@@ -0,0 +1,250 @@
+from collections import Counter
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Count
+
+from .models import Delivery, Order, OrderChange
+
+
+class DispatchPlan:
+    """
+    Результат распределения: назначения заказов в рестораны, заказы, для которых не нашлось
+    ресторана, и загрузка ресторанов с учётом назначений.
+    """
+
+    def __init__(self, restaurants_loads: dict[int, int]):
+        self.assignments = []
+        self.unassigned_orders_ids = []
+        self.restaurants_loads = restaurants_loads
+
+    def add(self, order_id: int, restaurant_id: int, distance: int, cost: float) -> None:
+        self.assignments.append({
+            'order_id': order_id,
+            'restaurant_id': restaurant_id,
+            'distance': distance,
+            'cost': cost,
+        })
+        self.restaurants_loads[restaurant_id] = self.restaurants_loads.get(restaurant_id, 0) + 1
+
+    def get_total_cost(self) -> float:
+        return sum(assignment['cost'] for assignment in self.assignments)
+
+    def get_total_distance(self) -> int:
+        return sum(assignment['distance'] for assignment in self.assignments)
+
+
+class CostMatrix:
+    """
+    Матрица стоимости назначения открытых заказов в рестораны. Строки — заказы, столбцы — рестораны.
+    Стоимость — расстояние доставки в километрах плюс load_weight километров за каждый заказ,
+    который ресторан уже готовит. Рестораны, которые не могут приготовить заказ или
+    до которых неизвестно расстояние, недопустимы.
+    """
+
+    def __init__(self, orders_ids, restaurants_ids, deliveries, restaurants_loads, load_weight, capacity=None):
+        self.orders_ids = np.array(sorted(orders_ids), dtype=np.int64)
+        self.restaurants_ids = np.array(sorted(restaurants_ids), dtype=np.int64)
+        self.load_weight = load_weight
+        self.capacity = capacity
+
+        self.distances = np.full((len(self.orders_ids), len(self.restaurants_ids)), np.inf)
+        if deliveries:
+            orders_column, restaurants_column, distances_column = np.array(deliveries, dtype=np.float64).T
+            rows = np.searchsorted(self.orders_ids, orders_column)
+            columns = np.searchsorted(self.restaurants_ids, restaurants_column)
+            self.distances[rows, columns] = distances_column
+
+        self.loads = np.array([restaurants_loads.get(restaurant_id, 0) for restaurant_id in self.restaurants_ids])
+
+    def get_free_slots(self) -> np.ndarray:
+        """
+        Функция возвращает, сколько заказов ещё можно назначить в каждый ресторан:
+        не больше свободной вместимости и не больше числа заказов, которые он может приготовить.
+        """
+        feasible_orders = np.isfinite(self.distances).sum(axis=0)
+        if self.capacity is None:
+            return feasible_orders
+
+        return np.minimum(np.clip(self.capacity - self.loads, 0, None), feasible_orders)
+
+    def solve_greedy(self) -> list[tuple[int, int]]:
+        """
+        Заказы по очереди, начиная с тех, у кого ближайший ресторан ближе всего, уходят в ресторан
+        с наименьшей стоимостью с учётом уже назначенных в этом проходе заказов.
+        """
+        loads = self.loads.astype(np.float64)
+        free_slots = self.get_free_slots()
+        pairs = []
+
+        if not len(self.restaurants_ids):
+            return pairs
+
+        for row in np.argsort(self.distances.min(axis=1, initial=np.inf), kind='stable'):
+            costs = self.distances[row] / 1000 + self.load_weight * loads
+            costs[free_slots <= 0] = np.inf
+
+            column = int(np.argmin(costs))
+            if not np.isfinite(costs[column]):
+                continue
+
+            pairs.append((int(row), column))
+            loads[column] += 1
+            free_slots[column] -= 1
+
+        return pairs
+
+    def get_exchanges(self, distances: np.ndarray, assignments: np.ndarray) -> np.ndarray:
+        """
+        Функция возвращает матрицу restaurants x restaurants: во сколько километров обойдётся
+        переназначить самый подходящий для этого заказ из ресторана-строки в ресторан-столбец.
+        """
+        exchanges = np.full((len(self.restaurants_ids), len(self.restaurants_ids)), np.inf)
+        rows = np.flatnonzero(assignments >= 0)
+
+        if len(rows):
+            rows = rows[np.argsort(assignments[rows], kind='stable')]
+            columns = assignments[rows]
+            starts = np.flatnonzero(np.r_[True, columns[1:] != columns[:-1]])
+            gains = distances[rows] - distances[rows, columns][:, np.newaxis]
+            exchanges[columns[starts]] = np.minimum.reduceat(gains, starts, axis=0)
+
+        np.fill_diagonal(exchanges, np.inf)
+
+        return exchanges
+
+    def solve_optimal(self) -> list[tuple[int, int]]:
+        """
+        Назначение с минимальной общей стоимостью — поток минимальной стоимости, в котором
+        k-й заказ в ресторане стоит на load_weight·k дороже. Заказы назначаются по одному
+        по самому дешёвому пути: заказ может занять ресторан, вытеснив по цепочке уже
+        назначенные заказы в другие рестораны, а за загрузку платит только последний ресторан
+        цепочки. Пути ищутся на матрице ресторанов, поэтому время растёт линейно с числом
+        заказов, а не квадратично, как у задачи о назначениях со слотами ресторанов.
+        Если ресторанам не хватает вместимости, назначаются самые дешёвые заказы.
+        """
+        restaurants_count = len(self.restaurants_ids)
+        restaurants = np.arange(restaurants_count)
+        distances = self.distances / 1000
+        free_slots = self.get_free_slots()
+        assigned_counts = np.zeros(restaurants_count, dtype=int)
+        assignments = np.full(len(self.orders_ids), -1)
+        waiting = np.isfinite(distances).any(axis=1)
+
+        while waiting.any():
+            waiting_rows = np.flatnonzero(waiting)
+            first_rows = waiting_rows[np.argmin(distances[waiting_rows], axis=0)]
+            path_costs = distances[first_rows, restaurants]
+            previous = np.full(restaurants_count, -1)
+            exchanges = self.get_exchanges(distances, assignments)
+
+            # Беллман — Форд: цепочка вытеснений не длиннее числа ресторанов, а отрицательных циклов нет,
+            # пока текущее назначение оптимально.
+            for _ in range(restaurants_count - 1):
+                costs_via = path_costs[:, np.newaxis] + exchanges
+                best_sources = costs_via.argmin(axis=0)
+                best_costs = costs_via[best_sources, restaurants]
+
+                improved = best_costs < path_costs - 1e-9
+                if not improved.any():
+                    break
+
+                path_costs[improved] = best_costs[improved]
+                previous[improved] = best_sources[improved]
+
+            load_costs = np.where(
+                assigned_counts < free_slots,
+                self.load_weight * (self.loads + assigned_counts),
+                np.inf,
+            )
+            column = int(np.argmin(path_costs + load_costs))
+            if not np.isfinite(path_costs[column] + load_costs[column]):
+                break
+
+            assigned_counts[column] += 1
+            while (source := previous[column]) >= 0:
+                source_rows = np.flatnonzero(assignments == source)
+                gains = distances[source_rows, column] - distances[source_rows, source]
+                assignments[source_rows[np.argmin(gains)]] = column
+                column = source
+
+            assignments[first_rows[column]] = column
+            waiting[first_rows[column]] = False
+
+        return [(int(row), int(assignments[row])) for row in np.flatnonzero(assignments >= 0)]
+
+    def get_cost(self, row: int, column: int, assigned_before: int) -> float:
+        return self.distances[row, column] / 1000 + self.load_weight * (self.loads[column] + assigned_before)
+
+
+def plan_dispatch(mode: str = 'optimal', load_weight: float = 2, capacity: int = None,
+                  limit: int = None) -> DispatchPlan:
+    """
+    Функция распределяет открытые заказы без ресторана по ресторанам, которые могут их
+    приготовить. Загрузка ресторана — число его недоставленных заказов.
+    """
+    orders_ids = Order.objects.get_not_delivered().order_by('id').values_list('id', flat=True)
+    orders_ids = list(orders_ids[:limit] if limit else orders_ids)
+
+    deliveries = list(
+        Delivery.objects.filter(
+            order_id__in=orders_ids,
+            can_fulfil=True,
+            distance__isnull=False,
+        ).values_list('order_id', 'restaurant_id', 'distance')
+    )
+    restaurants_loads = dict(
+        Order.objects.filter(
+            preparing_restaurant__isnull=False,
+        ).exclude(
+            status='4 delivered',
+        ).values('preparing_restaurant').annotate(load=Count('id')).values_list('preparing_restaurant', 'load')
+    )
+
+    matrix = CostMatrix(
+        orders_ids,
+        {restaurant_id for order_id, restaurant_id, distance in deliveries},
+        deliveries,
+        restaurants_loads,
+        load_weight,
+        capacity,
+    )
+    pairs = matrix.solve_optimal() if mode == 'optimal' else matrix.solve_greedy()
+
+    plan = DispatchPlan(restaurants_loads)
+    assigned_before = Counter()
+    for row, column in sorted(pairs, key=lambda pair: matrix.distances[pair]):
+        plan.add(
+            order_id=int(matrix.orders_ids[row]),
+            restaurant_id=int(matrix.restaurants_ids[column]),
+            distance=int(matrix.distances[row, column]),
+            cost=float(matrix.get_cost(row, column, assigned_before[column])),
+        )
+        assigned_before[column] += 1
+
+    assigned_orders_ids = {assignment['order_id'] for assignment in plan.assignments}
+    plan.unassigned_orders_ids = [order_id for order_id in orders_ids if order_id not in assigned_orders_ids]
+
+    return plan
+
+
+def apply_dispatch(plan: DispatchPlan) -> int:
+    """
+    Функция назначает заказам рестораны по плану одним запросом на ресторан. Заказы, которым
+    менеджер успел выбрать ресторан вручную, не меняются. Возвращает число назначенных заказов.
+    """
+    restaurants_orders_ids = {}
+    for assignment in plan.assignments:
+        restaurants_orders_ids.setdefault(assignment['restaurant_id'], []).append(assignment['order_id'])
+
+    assigned = 0
+    with transaction.atomic():
+        for restaurant_id, orders_ids in restaurants_orders_ids.items():
+            assigned += Order.objects.filter(
+                id__in=orders_ids,
+                preparing_restaurant__isnull=True,
+            ).update(preparing_restaurant_id=restaurant_id)
+
+        OrderChange.objects.log([assignment['order_id'] for assignment in plan.assignments])
+
+    return assigned
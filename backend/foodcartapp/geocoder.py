@@ -1,29 +1,436 @@
+import asyncio
+import threading
+import time
+import weakref
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import lru_cache
+
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
+from asgiref.sync import sync_to_async
 from django.conf import settings
+from django.utils.timezone import now
 
+from monitoring.metrics import record_geocoder_request
+from places.models import Place
 
-def fetch_coordinates(address: str) -> tuple[float, float] | None:
-    base_url = "https://geocode-maps.yandex.ru/1.x"
 
-    try:
-        response = requests.get(base_url, params=dict(geocode=address, apikey=settings.YANDEX_GEO_API, format="json"))
-        response.raise_for_status()
-        found_places = response.json()['response']['GeoObjectCollection']['featureMember']
-        most_relevant = found_places[0]
+cache_stats = Counter()
 
-    except requests.exceptions.ConnectionError:
-        return None
 
-    except requests.exceptions.HTTPError:
+class GeocoderError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """
+    После failures_threshold сбоев подряд размыкает цепь на reset_timeout секунд:
+    в это время запросы к геокодеру не отправляются. Затем пропускает пробный запрос.
+    """
+
+    def __init__(self, failures_threshold: int, reset_timeout: float):
+        self.failures_threshold = failures_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.opened_at is None:
+                return True
+
+            if time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.opened_at = time.monotonic()
+                return True
+
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+
+            if self.failures >= self.failures_threshold:
+                self.opened_at = time.monotonic()
+
+
+class RateLimiter:
+    def __init__(self, rate: float):
+        self.interval = 1 / rate if rate else 0
+        self.next_slot = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        Функция занимает ближайший свободный слот и возвращает, сколько секунд до него ждать.
+        """
+        with self._lock:
+            slot = max(self.next_slot, time.monotonic())
+            self.next_slot = slot + self.interval
+
+        return max(slot - time.monotonic(), 0)
+
+    def wait(self) -> None:
+        time.sleep(self.reserve())
+
+
+def parse_coordinates(payload: dict) -> tuple[float, float] | None:
+    found_places = payload['response']['GeoObjectCollection']['featureMember']
+
+    if not found_places:
         return None
 
-    except requests.exceptions.Timeout:
+    lon, lat = found_places[0]['GeoObject']['Point']['pos'].split(" ")
+
+    return float(lon), float(lat)
+
+
+class YandexGeocoder:
+    """
+    Клиент геокодера Яндекса с пулом соединений, таймаутами, повторами при сбоях,
+    размыкателем цепи и ограничением частоты запросов.
+    """
+
+    def __init__(self, apikey: str, base_url: str = 'https://geocode-maps.yandex.ru/1.x',
+                 timeout: tuple[float, float] = (3.05, 5), retries: int = 2, rate_limit: float = 10,
+                 max_workers: int = 8, failures_threshold: int = 5, reset_timeout: float = 30):
+        self.apikey = apikey
+        self.base_url = base_url
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self.breaker = CircuitBreaker(failures_threshold, reset_timeout)
+        self.rate_limiter = RateLimiter(rate_limit)
+
+        adapter = HTTPAdapter(
+            pool_maxsize=max_workers,
+            max_retries=Retry(
+                total=retries,
+                backoff_factor=0.3,
+                status_forcelist=[429, 500, 502, 503, 504],
+                allowed_methods=['GET'],
+            ),
+        )
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def request_coordinates(self, address: str) -> tuple[float, float] | None:
+        """
+        Функция запрашивает координаты (lon, lat) адреса у геокодера.
+        Возвращает None, если адрес не найден, и бросает GeocoderError при сбоях сети и API
+        или если цепь разомкнута.
+        """
+        if not self.breaker.allow():
+            raise GeocoderError(f'Geocoder circuit is open: {address}')
+
+        self.rate_limiter.wait()
+        started_at = time.perf_counter()
+
+        try:
+            response = self.session.get(
+                self.base_url,
+                params=dict(geocode=address, apikey=self.apikey, format="json"),
+                timeout=self.timeout,
+            )
+            response.raise_for_status()
+            coordinates = parse_coordinates(response.json())
+
+        except (requests.exceptions.RequestException, ValueError, KeyError) as error:
+            record_geocoder_request('error', time.perf_counter() - started_at)
+            self.breaker.record_failure()
+            raise GeocoderError(address) from error
+
+        record_geocoder_request('found' if coordinates else 'not_found', time.perf_counter() - started_at)
+        self.breaker.record_success()
+
+        return coordinates
+
+    def geocode_many(self, addresses: list[str]) -> dict[str, tuple[float, float] | None | GeocoderError]:
+        """
+        Функция параллельно запрашивает координаты адресов в пуле потоков.
+        Для адресов, которые не удалось запросить, в результате лежит исключение GeocoderError.
+        """
+        def request(address):
+            try:
+                return self.request_coordinates(address)
+            except GeocoderError as error:
+                return error
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return dict(zip(addresses, executor.map(request, addresses)))
+
+
+class AsyncYandexGeocoder:
+    """
+    Асинхронный клиент геокодера Яндекса для ASGI: пока ответ не пришёл, воркер обслуживает
+    другие запросы. Размыкатель цепи и ограничение частоты общие с синхронным клиентом.
+    """
+
+    def __init__(self, geocoder: YandexGeocoder):
+        import httpx
+
+        self.geocoder = geocoder
+        connect_timeout, read_timeout = geocoder.timeout
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=settings.GEOCODER_ASYNC_MAX_CONNECTIONS),
+            transport=httpx.AsyncHTTPTransport(retries=settings.GEOCODER_RETRIES),
+        )
+        self.errors = (httpx.HTTPError, ValueError, KeyError)
+
+    async def request_coordinates(self, address: str) -> tuple[float, float] | None:
+        """
+        Асинхронная версия YandexGeocoder.request_coordinates.
+        """
+        breaker = self.geocoder.breaker
+
+        if not breaker.allow():
+            raise GeocoderError(f'Geocoder circuit is open: {address}')
+
+        await asyncio.sleep(self.geocoder.rate_limiter.reserve())
+        started_at = time.perf_counter()
+
+        try:
+            response = await self.client.get(
+                self.geocoder.base_url,
+                params=dict(geocode=address, apikey=self.geocoder.apikey, format="json"),
+            )
+            response.raise_for_status()
+            coordinates = parse_coordinates(response.json())
+
+        except self.errors as error:
+            record_geocoder_request('error', time.perf_counter() - started_at)
+            breaker.record_failure()
+            raise GeocoderError(address) from error
+
+        except asyncio.CancelledError:
+            # Оформление заказа ждёт геокодер меньше, чем таймаут httpx, и отменяет запрос.
+            # Зависший геокодер должен размыкать цепь и в этом случае.
+            record_geocoder_request('timeout', time.perf_counter() - started_at)
+            breaker.record_failure()
+            raise
+
+        record_geocoder_request('found' if coordinates else 'not_found', time.perf_counter() - started_at)
+        breaker.record_success()
+
+        return coordinates
+
+
+# Клиент httpx привязан к циклу событий, поэтому у каждого цикла свой клиент.
+async_geocoders = weakref.WeakKeyDictionary()
+
+
+def get_async_geocoder() -> AsyncYandexGeocoder:
+    loop = asyncio.get_running_loop()
+
+    if loop not in async_geocoders:
+        async_geocoders[loop] = AsyncYandexGeocoder(get_geocoder())
+
+    return async_geocoders[loop]
+
+
+@lru_cache(maxsize=None)
+def get_geocoder() -> YandexGeocoder:
+    return YandexGeocoder(
+        apikey=settings.YANDEX_GEO_API,
+        base_url=settings.GEOCODER_URL,
+        timeout=(settings.GEOCODER_CONNECT_TIMEOUT, settings.GEOCODER_READ_TIMEOUT),
+        retries=settings.GEOCODER_RETRIES,
+        rate_limit=settings.GEOCODER_RATE_LIMIT,
+        max_workers=settings.GEOCODER_MAX_WORKERS,
+        failures_threshold=settings.GEOCODER_BREAKER_THRESHOLD,
+        reset_timeout=settings.GEOCODER_BREAKER_RESET_SECONDS,
+    )
+
+
+class PlacesCache:
+    """
+    LRU-кэш координат внутри процесса, стоящий перед таблицей Place.
+    Каждая запись живёт до момента expires_at, после чего считается промахом.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._places = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, address: str) -> tuple[bool, tuple[float, float] | None]:
+        with self._lock:
+            if address not in self._places:
+                return False, None
+
+            coordinates, expires_at = self._places[address]
+            if expires_at <= now():
+                del self._places[address]
+                return False, None
+
+            self._places.move_to_end(address)
+            return True, coordinates
+
+    def set(self, address: str, coordinates: tuple[float, float] | None, expires_at: datetime) -> None:
+        with self._lock:
+            self._places[address] = (coordinates, expires_at)
+            self._places.move_to_end(address)
+
+            while len(self._places) > self.maxsize:
+                self._places.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._places.clear()
+
+
+places_cache = PlacesCache(maxsize=settings.GEOCODER_CACHE_SIZE)
+
+
+def normalize_address(address: str) -> str:
+    return ' '.join(address.lower().replace(',', ' ').split())
+
+
+def get_expiration_time(place: Place) -> datetime:
+    if place.get_coordinates() is None:
+        return place.requested_at + settings.GEOCODER_NEGATIVE_CACHE_TTL
+
+    return place.requested_at + settings.GEOCODER_CACHE_TTL
+
+
+def geocode(address: str) -> tuple[float, float] | None:
+    """
+    Функция возвращает координаты (lon, lat) адреса, обращаясь к геокодеру только при промахе
+    кэша в памяти процесса и в таблице Place. Ненайденные адреса тоже кэшируются,
+    а ошибки сети и API — нет: о них сообщает исключение GeocoderError.
+    """
+    key = normalize_address(address)
+
+    if not key:
         return None
 
-    except IndexError:
+    found, coordinates = places_cache.get(key)
+    if found:
+        cache_stats['memory_hits'] += 1
+        return coordinates
+
+    place = Place.objects.filter(address=key).first()
+    if place and get_expiration_time(place) > now():
+        cache_stats['db_hits'] += 1
+        places_cache.set(key, place.get_coordinates(), get_expiration_time(place))
+        return place.get_coordinates()
+
+    cache_stats['misses'] += 1
+
+    try:
+        coordinates = get_geocoder().request_coordinates(address)
+    except GeocoderError:
+        cache_stats['errors'] += 1
+        raise
+
+    save_place(key, coordinates)
+
+    return coordinates
+
+
+def save_place(key: str, coordinates: tuple[float, float] | None) -> None:
+    lon, lat = coordinates or (None, None)
+    place, created = Place.objects.update_or_create(
+        address=key,
+        defaults={
+            'lon': lon,
+            'lat': lat,
+            'requested_at': now(),
+        },
+    )
+    places_cache.set(key, coordinates, get_expiration_time(place))
+
+
+def geocode_many(addresses: list[str]) -> dict[str, tuple[float, float] | None]:
+    """
+    Функция возвращает координаты сразу для многих адресов: кэш проверяется одним запросом к Place,
+    а промахи геокодируются параллельно. Адреса, которые не удалось запросить, получают None
+    и не кэшируются.
+    """
+    coordinates = {}
+    keys = {}
+
+    for address in addresses:
+        if not (key := normalize_address(address)):
+            coordinates[address] = None
+            continue
+
+        found, coordinates[address] = places_cache.get(key)
+        if found:
+            cache_stats['memory_hits'] += 1
+        else:
+            keys[address] = key
+
+    places = Place.objects.in_bulk(set(keys.values()), field_name='address')
+    missed_addresses = []
+
+    for address, key in keys.items():
+        if (place := places.get(key)) and get_expiration_time(place) > now():
+            cache_stats['db_hits'] += 1
+            coordinates[address] = place.get_coordinates()
+            places_cache.set(key, coordinates[address], get_expiration_time(place))
+        else:
+            missed_addresses.append(address)
+
+    cache_stats['misses'] += len(missed_addresses)
+
+    for address, result in get_geocoder().geocode_many(missed_addresses).items():
+        if isinstance(result, GeocoderError):
+            cache_stats['errors'] += 1
+            coordinates[address] = None
+            continue
+
+        save_place(keys[address], result)
+        coordinates[address] = result
+
+    return coordinates
+
+
+async def geocode_async(address: str) -> tuple[float, float] | None:
+    """
+    Асинхронная версия geocode: кэши те же, запрос к геокодеру не блокирует воркер ASGI.
+    """
+    key = normalize_address(address)
+
+    if not key:
         return None
 
-    lon, lat = most_relevant['GeoObject']['Point']['pos'].split(" ")
+    found, coordinates = places_cache.get(key)
+    if found:
+        cache_stats['memory_hits'] += 1
+        return coordinates
+
+    place = await sync_to_async(Place.objects.filter(address=key).first)()
+    if place and get_expiration_time(place) > now():
+        cache_stats['db_hits'] += 1
+        places_cache.set(key, place.get_coordinates(), get_expiration_time(place))
+        return place.get_coordinates()
+
+    cache_stats['misses'] += 1
+
+    try:
+        coordinates = await get_async_geocoder().request_coordinates(address)
+    except GeocoderError:
+        cache_stats['errors'] += 1
+        raise
 
-    return lon, lat
+    await sync_to_async(save_place)(key, coordinates)
+
+    return coordinates
+
+
+def fetch_coordinates(address: str) -> tuple[float, float] | None:
+    try:
+        return geocode(address)
+    except GeocoderError:
+        return None
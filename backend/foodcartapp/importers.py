@@ -0,0 +1,55 @@
+import json
+from itertools import islice
+
+
+def iter_json_array(file, chunk_size: int = 64 * 1024):
+    """
+    Функция по одному отдаёт объекты из JSON-массива в файле, читая его кусками по chunk_size символов,
+    поэтому файл не загружается в память целиком. Элементы массива должны быть объектами или массивами.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    started = False
+    eof = False
+
+    while True:
+        buffer = buffer.lstrip()
+
+        if not started and buffer:
+            if buffer[0] != '[':
+                raise ValueError('JSON file must contain an array')
+            buffer = buffer[1:]
+            started = True
+            continue
+
+        if started and buffer.startswith(','):
+            buffer = buffer[1:]
+            continue
+
+        if started and buffer.startswith(']'):
+            return
+
+        if started and buffer:
+            try:
+                item, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                yield item
+                buffer = buffer[end:]
+                continue
+
+        if eof:
+            raise ValueError('Unexpected end of JSON file')
+
+        chunk = file.read(chunk_size)
+        eof = not chunk
+        buffer += chunk
+
+
+def iter_batches(iterable, batch_size: int):
+    iterator = iter(iterable)
+
+    while batch := list(islice(iterator, batch_size)):
+        yield batch
@@ -0,0 +1,45 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils.timezone import now
+
+from foodcartapp.models import ArchivedOrder, Order
+
+
+class Command(BaseCommand):
+    help = 'Move old delivered orders to the archive'
+
+    def handle(self, *args, **options):
+        orders = Order.objects.filter(
+            status='4 delivered',
+            registered_at__lt=now() - timedelta(days=options['older_than_days']),
+        ).order_by('id')
+
+        if options['dry_run']:
+            self.stdout.write(f'{orders.count()} orders can be archived.')
+            return
+
+        archived = 0
+        while batch_archived := ArchivedOrder.objects.archive(orders[:options['batch_size']]):
+            archived += batch_archived
+            self.stdout.write(f'Archived {archived} orders.')
+
+        self.stdout.write(f'Done, {archived} orders moved to the archive.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than-days',
+            type=int,
+            default=settings.ORDERS_ARCHIVE_AFTER_DAYS,
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only count orders to archive',
+        )
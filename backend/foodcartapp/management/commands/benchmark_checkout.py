@@ -0,0 +1,104 @@
+import asyncio
+import time
+from uuid import uuid4
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, override_settings
+
+from foodcartapp import geocoder
+from foodcartapp.availability import get_availability_index
+from foodcartapp.models import Order
+from foodcartapp.testing import start_stub_geocoder
+from places.models import Place
+
+
+class Command(BaseCommand):
+    help = 'Load test async order registration against a slow stub geocoder in one event loop'
+
+    def handle(self, *args, **options):
+        products_ids = get_availability_index().get_available_products_ids()[:3]
+        if not products_ids:
+            raise CommandError('Add products available in restaurants first')
+
+        stub_server = start_stub_geocoder(delay=options['geocoder_delay'])
+
+        address_prefix = f'Нагрузочный тест {uuid4().hex[:8]}'
+        stub_settings = override_settings(
+            GEOCODER_URL=f'http://127.0.0.1:{stub_server.server_port}/',
+            GEOCODER_RATE_LIMIT=0,
+            ORDER_GEOCODING_TIMEOUT=options['geocoder_delay'] * 10,
+        )
+
+        try:
+            with stub_settings:
+                geocoder.get_geocoder.cache_clear()
+
+                for concurrency in [1, options['concurrency']]:
+                    duration = asyncio.run(self.send_orders(
+                        options['orders'],
+                        concurrency,
+                        products_ids,
+                        f'{address_prefix} {concurrency}',
+                    ))
+                    self.stdout.write(
+                        f'Concurrency {concurrency:>4}: {options["orders"]} orders in {duration:.2f} s, '
+                        f'{options["orders"] / duration:.1f} orders/s'
+                    )
+        finally:
+            stub_server.shutdown()
+            stub_server.server_close()
+            geocoder.get_geocoder.cache_clear()
+            geocoder.places_cache.clear()
+            Order.objects.filter(address__startswith=address_prefix).delete()
+            Place.objects.filter(address__startswith=geocoder.normalize_address(address_prefix)).delete()
+
+        self.stdout.write('Test orders were deleted.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--orders',
+            type=int,
+            default=100,
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=50,
+            help='Number of orders in flight at once in the second run',
+        )
+        parser.add_argument(
+            '--geocoder-delay',
+            type=float,
+            default=0.2,
+            help='Stub geocoder response time in seconds',
+        )
+
+    async def send_orders(self, orders: int, concurrency: int, products_ids: list[int], address_prefix: str) -> float:
+        """
+        Функция отправляет заказы с разными адресами через ASGI-обработчик Django,
+        держа в работе не больше concurrency заказов, и возвращает затраченное время.
+        Первый прогон с concurrency=1 показывает, сколько успел бы синхронный воркер.
+        """
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def send_order(number):
+            async with semaphore:
+                response = await client.post(
+                    '/api/order/',
+                    {
+                        'firstname': 'Нагрузочный',
+                        'lastname': 'Тест',
+                        'phonenumber': '+79161234567',
+                        'address': f'{address_prefix} {number}',
+                        'products': [{'product': product_id, 'quantity': 1} for product_id in products_ids],
+                    },
+                    content_type='application/json',
+                )
+                if response.status_code != 200:
+                    raise CommandError(f'Order registration failed: {response.content!r}')
+
+        started_at = time.perf_counter()
+        await asyncio.gather(*(send_order(number) for number in range(orders)))
+
+        return time.perf_counter() - started_at
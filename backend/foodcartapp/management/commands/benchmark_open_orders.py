@@ -0,0 +1,121 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from foodcartapp.importers import iter_batches
+from foodcartapp.models import Delivery, Order, Restaurant
+
+
+class Command(BaseCommand):
+    help = 'Compare open orders query plans with and without their indexes on synthetic data'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.add_orders(options['delivered'], options['open'], options['batch_size'])
+            self.add_deliveries(options['restaurants'], options['deliveries_per_order'], options['batch_size'])
+
+            self.print_plan('WITH INDEXES')
+
+            with connection.cursor() as cursor:
+                for index_name in ['open_orders_idx', 'delivery_order_distance_idx']:
+                    cursor.execute(f'DROP INDEX {connection.ops.quote_name(index_name)}')
+
+            self.print_plan('WITHOUT INDEXES')
+
+            transaction.set_rollback(True)
+
+        self.stdout.write('Synthetic orders, deliveries and index changes were rolled back.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--delivered',
+            type=int,
+            default=1_000_000,
+            help='Number of synthetic delivered orders',
+        )
+        parser.add_argument(
+            '--open',
+            type=int,
+            default=1000,
+            help='Number of synthetic open orders',
+        )
+        parser.add_argument(
+            '--restaurants',
+            type=int,
+            default=20,
+            help='Number of synthetic restaurants',
+        )
+        parser.add_argument(
+            '--deliveries-per-order',
+            type=int,
+            default=5,
+            help='Number of synthetic restaurants that can deliver each order',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=10_000,
+        )
+
+    def add_orders(self, delivered: int, open_orders: int, batch_size: int):
+        started_at = time.monotonic()
+        statuses = ['4 delivered'] * delivered + ['1 not processed', '2 cooking', '3 on way'] * (open_orders // 3)
+
+        for batch in iter_batches(enumerate(statuses), batch_size):
+            Order.objects.bulk_create([
+                Order(
+                    phonenumber='+79161234567',
+                    firstname='Benchmark',
+                    lastname=str(number),
+                    address='Benchmark',
+                    status=status,
+                )
+                for number, status in batch
+            ])
+
+        self.stdout.write(f'Added {len(statuses)} synthetic orders in {time.monotonic() - started_at:.1f}s.')
+
+    def add_deliveries(self, restaurants_count: int, deliveries_per_order: int, batch_size: int):
+        started_at = time.monotonic()
+        Restaurant.objects.bulk_create([
+            Restaurant(name=f'Benchmark {number}', address='Benchmark')
+            for number in range(restaurants_count)
+        ])
+
+        # bulk_create заполняет id не во всех СУБД, поэтому синтетические рестораны и заказы читаются из БД.
+        restaurants_ids = list(Restaurant.objects.filter(address='Benchmark').values_list('id', flat=True))
+        deliveries_per_order = min(deliveries_per_order, len(restaurants_ids))
+
+        orders_ids = Order.objects.filter(address='Benchmark').values_list('id', flat=True).iterator(batch_size)
+        added = 0
+        for batch in iter_batches(orders_ids, batch_size):
+            deliveries = [
+                Delivery(
+                    order_id=order_id,
+                    restaurant_id=restaurant_id,
+                    distance=random.randint(500, 20_000),
+                    can_fulfil=True,
+                )
+                for order_id in batch
+                for restaurant_id in random.sample(restaurants_ids, deliveries_per_order)
+            ]
+            Delivery.objects.bulk_create(deliveries)
+            added += len(deliveries)
+
+        self.stdout.write(f'Added {added} synthetic deliveries in {time.monotonic() - started_at:.1f}s.')
+
+    def print_plan(self, title: str):
+        orders = Order.objects.get_not_delivered()[:50]
+        deliveries = Delivery.objects.filter(order_id__in=orders.values('id')).order_by('order', 'distance')
+
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE {Order._meta.db_table}')
+            cursor.execute(f'ANALYZE {Delivery._meta.db_table}')
+
+        options = {'analyze': True, 'buffers': True} if connection.vendor == 'postgresql' else {}
+
+        self.stdout.write(f'\n{title}\n')
+        self.stdout.write('Open orders:\n' + orders.explain(**options))
+        self.stdout.write('Open orders deliveries:\n' + deliveries.explain(**options))
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from foodcartapp.models import Order
+
+
+class Command(BaseCommand):
+    help = 'Check that stored order prices match their kits'
+
+    def handle(self, *args, **options):
+        drifted_orders = (
+            Order.objects
+            .all()
+            .with_kits_price()
+            .exclude(price=F('kits_price'))
+            .values_list('id', 'price', 'kits_price')
+        )
+
+        drifted_orders_ids = []
+        for order_id, price, kits_price in drifted_orders.iterator():
+            self.stdout.write(f'\033[93mDRIFT:\033[0m order {order_id} costs {price}, its kits cost {kits_price}.')
+            drifted_orders_ids.append(order_id)
+
+        if not drifted_orders_ids:
+            self.stdout.write('All order prices match their kits.')
+            return
+
+        if options['fix']:
+            fixed = Order.objects.filter(id__in=drifted_orders_ids).update_prices()
+            self.stdout.write(f'Fixed {fixed} order prices.')
+        else:
+            self.stdout.write(f'{len(drifted_orders_ids)} order prices drifted, run with --fix to repair them.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            help='Recalculate drifted order prices',
+        )
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from foodcartapp.models import Delivery
+
+
+class Command(BaseCommand):
+    help = 'Delete delivery candidates of delivered and assigned orders'
+
+    def handle(self, *args, **options):
+        deliveries = Delivery.objects.of_closed_orders()
+
+        if options['dry_run']:
+            self.stdout.write(f'{deliveries.count()} deliveries can be deleted.')
+            return
+
+        deleted = 0
+        while deliveries_ids := list(deliveries.order_by().values_list('id', flat=True)[:options['batch_size']]):
+            deleted += Delivery.objects.filter(id__in=deliveries_ids).delete()[0]
+
+        self.stdout.write(f'Deleted {deleted} deliveries.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=10_000,
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only count deliveries to delete',
+        )
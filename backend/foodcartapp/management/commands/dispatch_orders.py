@@ -0,0 +1,75 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from foodcartapp.dispatch import apply_dispatch, plan_dispatch
+
+
+class Command(BaseCommand):
+    help = 'Assign open orders without a restaurant to restaurants by distance and current load'
+
+    def handle(self, *args, **options):
+        started_at = time.perf_counter()
+        plan = plan_dispatch(
+            mode=options['mode'],
+            load_weight=options['load_weight'],
+            capacity=options['capacity'],
+            limit=options['limit'],
+        )
+        duration = time.perf_counter() - started_at
+
+        if options['verbosity'] > 1:
+            for assignment in plan.assignments:
+                self.stdout.write(
+                    f'Order {assignment["order_id"]} -> restaurant {assignment["restaurant_id"]}: '
+                    f'{assignment["distance"]} m, cost {assignment["cost"]:.2f}'
+                )
+
+            for order_id in plan.unassigned_orders_ids:
+                self.stdout.write(f'Order {order_id}: no restaurant can fulfil it')
+
+        self.stdout.write(
+            f'Planned {len(plan.assignments)} orders in {duration:.3f} s ({options["mode"]}): '
+            f'total distance {plan.get_total_distance() / 1000:.1f} km, total cost {plan.get_total_cost():.1f}. '
+            f'{len(plan.unassigned_orders_ids)} orders left unassigned.'
+        )
+        for restaurant_id, load in sorted(plan.restaurants_loads.items()):
+            self.stdout.write(f'Restaurant {restaurant_id}: {load} orders in progress')
+
+        if options['dry_run']:
+            return
+
+        assigned = apply_dispatch(plan)
+        self.stdout.write(f'Done, {assigned} orders assigned to restaurants.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--mode',
+            choices=['optimal', 'greedy'],
+            default='optimal',
+            help='optimal minimizes the total cost, greedy picks the cheapest restaurant order by order',
+        )
+        parser.add_argument(
+            '--load-weight',
+            type=float,
+            default=settings.DISPATCH_LOAD_WEIGHT,
+            help='Extra kilometres of cost for each order a restaurant is already preparing',
+        )
+        parser.add_argument(
+            '--capacity',
+            type=int,
+            default=settings.DISPATCH_RESTAURANT_CAPACITY,
+            help='Maximum number of orders in progress per restaurant',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=None,
+            help='Dispatch only the oldest open orders',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only print the plan',
+        )
@@ -0,0 +1,38 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils.timezone import now
+
+from foodcartapp.models import OrderChange
+
+
+class Command(BaseCommand):
+    help = 'Delete old records of the order changes log used by the manager orders page'
+
+    def handle(self, *args, **options):
+        # Записи начиная с курсора, который получают новые страницы заказов, остаются: на них ссылаются
+        # открытые страницы.
+        settled_at = now() - timedelta(seconds=settings.ORDER_CHANGES_SETTLE_SECONDS)
+        changes = OrderChange.objects.filter(
+            changed_at__lt=now() - timedelta(hours=options['older_than_hours']),
+            id__lt=OrderChange.objects.get_settled_cursor(settled_at),
+        )
+
+        deleted = 0
+        while changes_ids := list(changes.values_list('id', flat=True)[:options['batch_size']]):
+            deleted += OrderChange.objects.filter(id__in=changes_ids).delete()[0]
+
+        self.stdout.write(f'Deleted {deleted} order changes.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than-hours',
+            type=int,
+            default=24,
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=10_000,
+        )
@@ -0,0 +1,63 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from foodcartapp.models import DeliveryJob
+
+
+class Command(BaseCommand):
+    help = 'Start calculating order deliveries in background'
+
+    def handle(self, *args, **options):
+        while True:
+            processed = self.run_jobs(options['batch_size'])
+
+            if processed:
+                self.stdout.write(f'Processed {processed} delivery jobs.')
+
+            if options['once']:
+                break
+
+            if not processed:
+                time.sleep(options['sleep'])
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Process ready jobs and exit',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=1,
+            help='Seconds to wait when the queue is empty',
+        )
+
+    @staticmethod
+    def run_jobs(batch_size: int) -> int:
+        processed = 0
+
+        for _ in range(batch_size):
+            with transaction.atomic():
+                job = (
+                    DeliveryJob.objects
+                    .ready()
+                    .select_for_update(skip_locked=True, of=('self',))
+                    .select_related('order')
+                    .first()
+                )
+                if not job:
+                    break
+
+                job.run()
+
+            processed += 1
+
+        return processed
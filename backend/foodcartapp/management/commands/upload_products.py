@@ -1,20 +1,33 @@
-import json
+import time
+from collections import Counter
+from decimal import Decimal
 
 from django.core.management.base import BaseCommand
+from django.db import transaction
 
-from backend.foodcartapp.models import Product, ProductCategory, Restaurant, RestaurantMenuItem
+from foodcartapp.importers import iter_batches, iter_json_array
+from foodcartapp.models import Delivery, Product, ProductCategory, Restaurant, RestaurantMenuItem
+from foodcartapp.versions import bump_version
 
 
 class Command(BaseCommand):
     help = 'Start adding products'
 
     def handle(self, *args, **options):
+        started_at = time.monotonic()
+        stats = Counter()
+        restaurants_ids = list(Restaurant.objects.values_list('id', flat=True))
 
         with open(options['path'], 'r', encoding='utf-8') as file:
-            products = json.load(file)
+            for products_notes in iter_batches(iter_json_array(file), options['batch_size']):
+                self.add_products(products_notes, restaurants_ids, stats)
 
-        for product in products:
-            self.add_product(product)
+        elapsed = time.monotonic() - started_at
+        self.stdout.write(
+            f'Imported {stats["products"]} products '
+            f'({stats["created"]} added, {stats["updated"]} updated, {stats["categories"]} new categories) '
+            f'in {elapsed:.2f}s: {stats["products"] / max(elapsed, 1e-6):.0f} products/s.'
+        )
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -22,40 +35,85 @@ class Command(BaseCommand):
             nargs='?',
             type=str,
         )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+        )
 
     @staticmethod
-    def add_category(category: str) -> ProductCategory:
-        if category:
-            category_obj, created = ProductCategory.objects.get_or_create(
-                name=category,
+    def add_categories(categories_names: set[str], stats: Counter) -> dict[str, ProductCategory]:
+        categories = {category.name: category for category in ProductCategory.objects.filter(name__in=categories_names)}
+        new_categories = [ProductCategory(name=name) for name in categories_names - categories.keys()]
+
+        if new_categories:
+            ProductCategory.objects.bulk_create(new_categories)
+            stats['categories'] += len(new_categories)
+            categories.update(
+                (category.name, category)
+                for category in ProductCategory.objects.filter(name__in=categories_names)
             )
-            return category_obj
+
+        return categories
 
     @staticmethod
-    def add_product_to_menu(product: Product):
-        restaurants = Restaurant.objects.all()
+    def add_products_to_menu(products_ids: list[int], restaurants_ids: list[int]):
+        RestaurantMenuItem.objects.bulk_create(
+            [
+                RestaurantMenuItem(restaurant_id=restaurant_id, product_id=product_id)
+                for product_id in products_ids
+                for restaurant_id in restaurants_ids
+            ],
+            ignore_conflicts=True,
+            batch_size=1000,
+        )
+        Delivery.objects.of_open_orders().filter(order__kits__product_id__in=products_ids).distinct().update_can_fulfil()
 
-        for restaurant in restaurants:
-            menu_product, created = RestaurantMenuItem.objects.get_or_create(
-                restaurant=restaurant,
-                product=product,
-            )
+    @transaction.atomic
+    def add_products(self, products_notes: list[dict], restaurants_ids: list[int], stats: Counter):
+        products_notes = {product_notes['title']: product_notes for product_notes in products_notes}
+        categories = self.add_categories(
+            {product_notes['type'] for product_notes in products_notes.values() if product_notes.get('type')},
+            stats,
+        )
+        products = {product.name: product for product in Product.objects.filter(name__in=products_notes)}
 
-    def add_product(self, product_notes: dict):
-        product, created = Product.objects.get_or_create(
-            name=product_notes['title'],
-            price=product_notes['price'],
-            image=product_notes['img'],
-            defaults={
-                'category': self.add_category(product_notes.get('type')),
+        new_products = []
+        changed_products = []
+        for title, product_notes in products_notes.items():
+            product = products.get(title) or Product(name=title)
+            fields = {
+                'price': Decimal(str(product_notes['price'])),
+                'image': product_notes['img'],
+                'category_id': getattr(categories.get(product_notes.get('type')), 'id', None),
                 'description': product_notes.get('description', ''),
                 'special_status': product_notes.get('special_status', False),
             }
+
+            if not product.pk:
+                new_products.append(product)
+            elif any(getattr(product, field) != value for field, value in fields.items()):
+                changed_products.append(product)
+
+            for field, value in fields.items():
+                setattr(product, field, value)
+
+        Product.objects.bulk_create(new_products)
+        Product.objects.bulk_update(
+            changed_products,
+            ['price', 'image', 'category', 'description', 'special_status'],
+        )
+
+        self.add_products_to_menu(
+            list(Product.objects.filter(name__in=products_notes).values_list('id', flat=True)),
+            restaurants_ids,
         )
 
-        self.add_product_to_menu(product)
+        # Версии в БД общие для всех процессов: после коммита пачки воркеры перестроят индекс наличия
+        # и каталог, даже если импорт потом упадёт на следующей пачке.
+        transaction.on_commit(lambda: bump_version('availability'))
+        transaction.on_commit(lambda: bump_version('catalog'))
 
-        if created:
-            self.stdout.write(f'Added product "{product}".')
-        else:
-            self.stdout.write(f'\033[93mDOUBLE:\033[0m product "{product}" already exists!')
+        stats['products'] += len(products_notes)
+        stats['created'] += len(new_products)
+        stats['updated'] += len(changed_products)
@@ -1,20 +1,73 @@
-import json
+import time
+from contextlib import contextmanager
 
 from django.core.management.base import BaseCommand
+from django.db import transaction
 
-from backend.foodcartapp.models import Restaurant
+from foodcartapp.geocoder import geocode_many
+from foodcartapp.importers import iter_json_array
+from foodcartapp.models import Restaurant
+from foodcartapp.versions import bump_version
 
 
 class Command(BaseCommand):
     help = 'Start adding restaurants'
 
     def handle(self, *args, **options):
+        self.timings = {}
 
-        with open(options['path'], 'r', encoding='utf-8') as file:
-            restaurants = json.load(file)
+        with self.phase('read'):
+            with open(options['path'], 'r', encoding='utf-8') as file:
+                restaurants_notes = {notes['title']: notes for notes in iter_json_array(file)}
 
-        for restaurant in restaurants:
-            self.add_restaurant(restaurant)
+        with self.phase('diff'):
+            new_restaurants, changed_restaurants = self.get_changes(restaurants_notes)
+
+        for restaurant in new_restaurants:
+            self.stdout.write(f'\033[92mNEW:\033[0m restaurant "{restaurant}" ({restaurant.address}).')
+        for restaurant in changed_restaurants:
+            self.stdout.write(f'\033[93mCHANGED:\033[0m restaurant "{restaurant}" ({restaurant.address}).')
+        self.stdout.write(
+            f'{len(new_restaurants)} new, {len(changed_restaurants)} changed, '
+            f'{len(restaurants_notes) - len(new_restaurants) - len(changed_restaurants)} unchanged restaurants.'
+        )
+
+        if options['dry_run']:
+            self.print_timings()
+            return
+
+        with self.phase('upsert'), transaction.atomic():
+            Restaurant.objects.bulk_create(new_restaurants)
+            Restaurant.objects.bulk_update(changed_restaurants, ['address', 'contact_phone', 'lat', 'lon'])
+
+        try:
+            with self.phase('geocode'):
+                addresses = {restaurant.address for restaurant in new_restaurants + changed_restaurants}
+                coordinates = geocode_many(list(addresses))
+
+            with self.phase('save coordinates'), transaction.atomic():
+                restaurants = Restaurant.objects.filter(
+                    name__in=restaurants_notes,
+                    address__in=addresses,
+                    lat__isnull=True,
+                )
+                geocoded_restaurants = []
+                for restaurant in restaurants:
+                    if restaurant_coordinates := coordinates.get(restaurant.address):
+                        restaurant.lon, restaurant.lat = restaurant_coordinates
+                        geocoded_restaurants.append(restaurant)
+
+                Restaurant.objects.bulk_update(geocoded_restaurants, ['lat', 'lon'])
+        finally:
+            # Версия в БД общая для всех процессов: воркер доставки перестроит индекс ресторанов,
+            # даже если геокодирование упало и у новых ресторанов пока нет координат.
+            bump_version('restaurants')
+
+        self.stdout.write(
+            f'Found {sum(1 for address in addresses if coordinates.get(address))} of {len(addresses)} addresses, '
+            f'filled coordinates of {len(geocoded_restaurants)} restaurants.'
+        )
+        self.print_timings()
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -22,17 +75,49 @@ class Command(BaseCommand):
             nargs='?',
             type=str,
         )
-
-    def add_restaurant(self, restaurant_notes: dict):
-        restaurant, created = Restaurant.objects.get_or_create(
-            name=restaurant_notes['title'],
-            defaults={
-                'address': restaurant_notes.get('address', ''),
-                'contact_phone': restaurant_notes.get('contact_phone', ''),
-            }
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show new and changed restaurants without saving them',
         )
 
-        if created:
-            self.stdout.write(f'Added restaurant "{restaurant}".')
-        else:
-            self.stdout.write(f'\033[93mDOUBLE:\033[0m restaurant "{restaurant}" already exists!')
+    @contextmanager
+    def phase(self, name: str):
+        started_at = time.monotonic()
+        try:
+            yield
+        finally:
+            self.timings[name] = time.monotonic() - started_at
+
+    def print_timings(self):
+        for name, elapsed in self.timings.items():
+            self.stdout.write(f'{name:>18}: {elapsed:.2f}s')
+
+    @staticmethod
+    def get_changes(restaurants_notes: dict[str, dict]) -> tuple[list[Restaurant], list[Restaurant]]:
+        restaurants = {
+            restaurant.name: restaurant
+            for restaurant in Restaurant.objects.filter(name__in=restaurants_notes)
+        }
+        new_restaurants = []
+        changed_restaurants = []
+
+        for title, restaurant_notes in restaurants_notes.items():
+            address = restaurant_notes.get('address', '')
+            contact_phone = restaurant_notes.get('contact_phone', '')
+
+            if not (restaurant := restaurants.get(title)):
+                new_restaurants.append(Restaurant(name=title, address=address, contact_phone=contact_phone))
+                continue
+
+            if restaurant.address == address and restaurant.contact_phone == contact_phone:
+                continue
+
+            if restaurant.address != address:
+                restaurant.lat = restaurant.lon = None
+
+            restaurant.address = address
+            restaurant.contact_phone = contact_phone
+            changed_restaurants.append(restaurant)
+
+        return new_restaurants, changed_restaurants
@@ -0,0 +1,31 @@
+# Generated by Django 3.2.15 on 2026-10-18 18:08
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeliveryJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'В очереди'), ('done', 'Выполнена'), ('failed', 'Ошибка')], db_index=True, default='pending', max_length=10, verbose_name='статус')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='попыток')),
+                ('run_after', models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='запустить после')),
+                ('error', models.TextField(blank=True, verbose_name='последняя ошибка')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='обновлена')),
+                ('order', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='delivery_job', to='foodcartapp.order', verbose_name='заказ')),
+            ],
+            options={
+                'verbose_name': 'задача расчёта доставки',
+                'verbose_name_plural': 'задачи расчёта доставки',
+            },
+        ),
+    ]
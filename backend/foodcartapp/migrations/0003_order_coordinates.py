@@ -0,0 +1,33 @@
+# Generated by Django 3.2.15 on 2026-10-18 18:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0002_deliveryjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='geocoded_at',
+            field=models.DateTimeField(editable=False, null=True, verbose_name='координаты определены'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='geocoding_status',
+            field=models.CharField(choices=[('not geocoded', 'Не определены'), ('found', 'Найдены'), ('not found', 'Адрес не найден')], default='not geocoded', editable=False, max_length=15, verbose_name='координаты адреса'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='lat',
+            field=models.DecimalField(decimal_places=6, editable=False, max_digits=8, null=True, verbose_name='широта'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='lon',
+            field=models.DecimalField(decimal_places=6, editable=False, max_digits=8, null=True, verbose_name='долгота'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 3.2.15 on 2026-10-18 18:11
+
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef
+
+
+def fill_can_fulfil(apps, schema_editor):
+    Delivery = apps.get_model('foodcartapp', 'Delivery')
+    OrderKit = apps.get_model('foodcartapp', 'OrderKit')
+    RestaurantMenuItem = apps.get_model('foodcartapp', 'RestaurantMenuItem')
+
+    # Одним UPDATE: ресторан может приготовить заказ, если в заказе нет продукта, которого нет в его меню.
+    available_menu_items = RestaurantMenuItem.objects.filter(
+        restaurant_id=OuterRef(OuterRef('restaurant_id')),
+        product_id=OuterRef('product_id'),
+        availability=True,
+    )
+    missing_kits = OrderKit.objects.filter(order_id=OuterRef('order_id')).filter(~Exists(available_menu_items))
+    Delivery.objects.filter(~Exists(missing_kits)).update(can_fulfil=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0003_order_coordinates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='delivery',
+            name='can_fulfil',
+            field=models.BooleanField(db_index=True, default=False, verbose_name='есть все продукты заказа'),
+        ),
+        migrations.RunPython(fill_can_fulfil, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 3.2.15 on 2026-10-18 18:16
+
+import django.core.validators
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_prices(apps, schema_editor):
+    Order = apps.get_model('foodcartapp', 'Order')
+    OrderKit = apps.get_model('foodcartapp', 'OrderKit')
+
+    kits_price = (
+        OrderKit.objects
+        .filter(order=OuterRef('pk'))
+        .values('order')
+        .annotate(total=Sum('price'))
+        .values('total')
+    )
+    Order.objects.update(price=Coalesce(Subquery(kits_price), Value(0), output_field=models.DecimalField()))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0004_delivery_can_fulfil'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='price',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=10, validators=[django.core.validators.MinValueValidator(0)], verbose_name='стоимость'),
+        ),
+        migrations.RunPython(fill_prices, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 3.2.15 on 2026-10-18 18:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0005_order_price'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='delivery',
+            index=models.Index(fields=['order', 'distance'], name='delivery_order_distance_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('preparing_restaurant__isnull', True), models.Q(('status', '4 delivered'), _negated=True)), fields=['status', 'id'], name='open_orders_idx'),
+        ),
+    ]
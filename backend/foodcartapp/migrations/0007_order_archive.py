@@ -0,0 +1,70 @@
+# Generated by Django 3.2.15 on 2026-10-18 18:18
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+import phonenumber_field.modelfields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0006_open_orders_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedOrder',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False, verbose_name='ID')),
+                ('phonenumber', phonenumber_field.modelfields.PhoneNumberField(db_index=True, max_length=128, region='RU', verbose_name='телефон')),
+                ('status', models.CharField(choices=[('1 not processed', 'Необработан'), ('2 cooking', 'Готовится'), ('3 on way', 'В пути'), ('4 delivered', 'Доставлен')], max_length=15, verbose_name='статус')),
+                ('payment', models.CharField(choices=[('not specified', 'Не указана'), ('cash', 'Наличными'), ('card', 'Картой'), ('online', 'Онлайн')], max_length=15, verbose_name='оплата')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='стоимость')),
+                ('firstname', models.CharField(max_length=50, verbose_name='имя')),
+                ('lastname', models.CharField(max_length=50, verbose_name='фамилия')),
+                ('address', models.CharField(blank=True, max_length=150, verbose_name='адрес доставки')),
+                ('lat', models.DecimalField(decimal_places=6, max_digits=8, null=True, verbose_name='широта')),
+                ('lon', models.DecimalField(decimal_places=6, max_digits=8, null=True, verbose_name='долгота')),
+                ('registered_at', models.DateTimeField(db_index=True, verbose_name='оформлен')),
+                ('processed_at', models.DateTimeField(null=True, verbose_name='обработан')),
+                ('delivered_at', models.DateTimeField(null=True, verbose_name='доставлен')),
+                ('comment', models.TextField(blank=True, verbose_name='комментарий')),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='перенесён в архив')),
+                ('preparing_restaurant', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_orders', to='foodcartapp.restaurant', verbose_name='Готовился в ресторане')),
+            ],
+            options={
+                'verbose_name': 'архивный заказ',
+                'verbose_name_plural': 'архив заказов',
+                'ordering': ['-registered_at', '-id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedOrderKit',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.PositiveSmallIntegerField(verbose_name='количество')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=8, verbose_name='стоимость')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='kits', to='foodcartapp.archivedorder', verbose_name='заказ')),
+                ('product', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_kits', to='foodcartapp.product', verbose_name='продукт')),
+            ],
+            options={
+                'verbose_name': 'состав архивного заказа',
+                'verbose_name_plural': 'составы архивных заказов',
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedDelivery',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('distance', models.PositiveIntegerField(null=True, verbose_name='расстояние доставки (м)')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deliveries', to='foodcartapp.archivedorder', verbose_name='заказ')),
+                ('restaurant', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_deliveries', to='foodcartapp.restaurant', verbose_name='ресторан')),
+            ],
+            options={
+                'verbose_name': 'вариант доставки архивного заказа',
+                'verbose_name_plural': 'варианты доставки архивных заказов',
+                'ordering': ['distance'],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.15 on 2026-10-18 18:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0007_order_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='idempotency_key',
+            field=models.CharField(editable=False, max_length=64, null=True, unique=True, verbose_name='ключ идемпотентности'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 3.2.15 on 2026-10-18 18:31
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0008_order_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderChange',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order_id', models.IntegerField(verbose_name='ID заказа')),
+                ('changed_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='изменён')),
+            ],
+            options={
+                'verbose_name': 'изменение заказа',
+                'verbose_name_plural': 'изменения заказов',
+            },
+        ),
+    ]
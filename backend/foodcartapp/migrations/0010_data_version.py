@@ -0,0 +1,24 @@
+# Generated by Django 3.2.15 on 2026-10-18 18:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0009_order_change'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DataVersion',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False, verbose_name='данные')),
+                ('version', models.PositiveBigIntegerField(default=0, verbose_name='версия')),
+            ],
+            options={
+                'verbose_name': 'версия данных',
+                'verbose_name_plural': 'версии данных',
+            },
+        ),
+    ]
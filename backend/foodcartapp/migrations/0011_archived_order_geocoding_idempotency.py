@@ -0,0 +1,29 @@
+# Generated by Django 3.2.15 on 2026-10-18 19:07
+
+from django.db import migrations, models
+
+
+def fill_geocoding_status(apps, schema_editor):
+    ArchivedOrder = apps.get_model('foodcartapp', 'ArchivedOrder')
+    ArchivedOrder.objects.filter(lat__isnull=False, lon__isnull=False).update(geocoding_status='found')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0010_data_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedorder',
+            name='geocoding_status',
+            field=models.CharField(choices=[('not geocoded', 'Не определены'), ('found', 'Найдены'), ('not found', 'Адрес не найден')], default='not geocoded', max_length=15, verbose_name='координаты адреса'),
+        ),
+        migrations.AddField(
+            model_name='archivedorder',
+            name='idempotency_key',
+            field=models.CharField(max_length=64, null=True, unique=True, verbose_name='ключ идемпотентности'),
+        ),
+        migrations.RunPython(fill_geocoding_status, migrations.RunPython.noop),
+    ]
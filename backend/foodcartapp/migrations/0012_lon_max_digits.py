@@ -0,0 +1,28 @@
+# Generated by Django 3.2.15 on 2026-10-18 19:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0011_archived_order_geocoding_idempotency'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='archivedorder',
+            name='lon',
+            field=models.DecimalField(decimal_places=6, max_digits=9, null=True, verbose_name='долгота'),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='lon',
+            field=models.DecimalField(decimal_places=6, editable=False, max_digits=9, null=True, verbose_name='долгота'),
+        ),
+        migrations.AlterField(
+            model_name='restaurant',
+            name='lon',
+            field=models.DecimalField(decimal_places=6, editable=False, max_digits=9, null=True, verbose_name='долгота'),
+        ),
+    ]
@@ -1,10 +1,15 @@
-from geopy import distance as calculate_distance
-from django.db import models, utils
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connections, models, transaction, utils
+from django.db.models import Value
+from django.db.models.functions import Coalesce
 from django.core.validators import MinValueValidator
 from django.utils.timezone import now
 from phonenumber_field.modelfields import PhoneNumberField
 
-from .geocoder import fetch_coordinates
+from .availability import get_availability_index
+from .geocoder import fetch_coordinates, geocode
 
 
 class Restaurant(models.Model):
@@ -33,7 +38,7 @@ class Restaurant(models.Model):
         verbose_name='долгота',
         decimal_places=6,
         editable=False,
-        max_digits=8,
+        max_digits=9,
         null=True,
     )
 
@@ -44,24 +49,23 @@ class Restaurant(models.Model):
     def __str__(self):
         return self.name
 
-    def get_coordinates(self) -> tuple[lon: float, lat: float]:
-        if not self.lon or not self.lat:
-            lon, lat = fetch_coordinates(self.address)
-            self.lon = lon
-            self.lat = lat
-            self.save()
+    def get_coordinates(self) -> tuple[lon: float, lat: float] | None:
+        if self.lon is None or self.lat is None:
+            return None
 
         return self.lon, self.lat
 
+    def geocode(self) -> None:
+        """
+        Функция определяет координаты адреса ресторана, не сохраняя ресторан.
+        Если адрес не найден или геокодер недоступен, координаты остаются пустыми.
+        """
+        self.lon, self.lat = fetch_coordinates(self.address) or (None, None)
+
 
 class ProductQuerySet(models.QuerySet):
     def available(self):
-        products = (
-            RestaurantMenuItem.objects
-            .filter(availability=True)
-            .values_list('product')
-        )
-        return self.filter(pk__in=products)
+        return self.filter(pk__in=get_availability_index().get_available_products_ids())
 
 
 class ProductCategory(models.Model):
@@ -155,17 +159,34 @@ class OrderQuerySet(models.QuerySet):
     def get_not_delivered(self):
         return self.filter(preparing_restaurant__isnull=True).exclude(status='4 delivered')
 
+    def with_kits_price(self):
+        return self.annotate(
+            kits_price=Coalesce(
+                models.Sum('kits__price'),
+                Value(0),
+                output_field=models.DecimalField(),
+            ),
+        )
+
+    def update_prices(self) -> int:
+        """
+        Функция одним запросом пересчитывает стоимость заказов выборки по их составам(модель OrderKit).
+        """
+        kits_price = (
+            OrderKit.objects
+            .filter(order=models.OuterRef('pk'))
+            .values('order')
+            .annotate(total=models.Sum('price'))
+            .values('total')
+        )
+        return self.update(price=Coalesce(models.Subquery(kits_price), Value(0), output_field=models.DecimalField()))
+
 
 class OrderManager(models.Manager):
     def get_queryset(self):
         return OrderQuerySet(
             self.model,
             using=self._db,
-        ).annotate(
-            price=models.Sum(
-                models.F('kits__price'),
-                output_field=models.DecimalField(),
-            ),
         ).order_by(
             'status',
             'id',
@@ -188,6 +209,11 @@ class Order(models.Model):
         ('card', 'Картой'),
         ('online', 'Онлайн'),
     ]
+    GEOCODING_STATUS_CHOICES = [
+        ('not geocoded', 'Не определены'),
+        ('found', 'Найдены'),
+        ('not found', 'Адрес не найден'),
+    ]
 
     phonenumber = PhoneNumberField(
         'телефон',
@@ -208,6 +234,14 @@ class Order(models.Model):
         db_index=True,
         max_length=15,
     )
+    price = models.DecimalField(
+        verbose_name='стоимость',
+        max_digits=10,
+        decimal_places=2,
+        default=0,
+        editable=False,
+        validators=[MinValueValidator(0)],
+    )
     firstname = models.CharField(
         'имя',
         max_length=50
@@ -221,6 +255,32 @@ class Order(models.Model):
         max_length=150,
         blank=True,
     )
+    lat = models.DecimalField(
+        verbose_name='широта',
+        decimal_places=6,
+        editable=False,
+        max_digits=8,
+        null=True,
+    )
+    lon = models.DecimalField(
+        verbose_name='долгота',
+        decimal_places=6,
+        editable=False,
+        max_digits=9,
+        null=True,
+    )
+    geocoding_status = models.CharField(
+        verbose_name='координаты адреса',
+        choices=GEOCODING_STATUS_CHOICES,
+        default='not geocoded',
+        editable=False,
+        max_length=15,
+    )
+    geocoded_at = models.DateTimeField(
+        verbose_name='координаты определены',
+        editable=False,
+        null=True,
+    )
     registered_at = models.DateTimeField(
         verbose_name='оформлен',
         default=now,
@@ -248,6 +308,13 @@ class Order(models.Model):
         blank=True,
         null=True,
     )
+    idempotency_key = models.CharField(
+        verbose_name='ключ идемпотентности',
+        max_length=64,
+        unique=True,
+        editable=False,
+        null=True,
+    )
     products = models.ManyToManyField(
         Product,
         related_name='orders',
@@ -261,27 +328,103 @@ class Order(models.Model):
     class Meta:
         verbose_name = 'заказ'
         verbose_name_plural = 'заказы'
+        indexes = [
+            models.Index(
+                fields=['status', 'id'],
+                name='open_orders_idx',
+                condition=models.Q(preparing_restaurant__isnull=True) & ~models.Q(status='4 delivered'),
+            ),
+        ]
 
     def __str__(self):
         return f'{self.phonenumber} {self.firstname} {self.lastname}'
 
-    def get_verified_deliveries(self) -> list:
+    def geocode(self) -> None:
         """
-        Функция проверяет наличие в ресторане(модель Restaurant) продуктов из заказа(модель Order/self).
-        На основе результата проверки возвращается список для выбора проверенных вариантов доставки(модель Delivery).
+        Функция один раз определяет координаты адреса заказа и сохраняет их вместе со статусом.
+        При сбое геокодера пробрасывает GeocoderError, оставляя координаты неопределёнными.
         """
-        order_products_ids = set(self.products.all().values_list('id', flat=True))
-        verified_deliveries = []
+        coordinates = geocode(self.address)
 
-        for delivery in self.deliveries.filter(order=self):
-            restaurant_products_ids = set(
-                delivery.restaurant.menu_items.filter(availability=True).values_list('product__id', flat=True)
-            )
+        self.lon, self.lat = coordinates or (None, None)
+        self.geocoding_status = 'found' if coordinates else 'not found'
+        self.geocoded_at = now()
+        self.save(update_fields=['lon', 'lat', 'geocoding_status', 'geocoded_at'])
+
+    def reset_coordinates(self) -> None:
+        self.lon = self.lat = self.geocoded_at = None
+        self.geocoding_status = 'not geocoded'
+        self.save(update_fields=['lon', 'lat', 'geocoding_status', 'geocoded_at'])
+
+    def get_coordinates(self) -> tuple[float, float] | None:
+        if self.geocoding_status == 'not geocoded':
+            self.geocode()
+
+        if self.geocoding_status != 'found':
+            return None
+
+        return self.lon, self.lat
+
+    def calculate_deliveries(self, max_distance=50000) -> None:
+        """
+        Функция оставляет заказу варианты доставки(модель Delivery) только из ресторанов
+        в радиусе max_distance метров от клиента, которые находит индекс ресторанов.
+        Если адрес клиента не найден, варианты создаются для всех ресторанов без расстояния,
+        чтобы менеджер уточнил адрес. Если задана настройка DELIVERY_CANDIDATES_LIMIT,
+        сохраняется только столько ближайших ресторанов, в первую очередь из тех, что могут
+        приготовить заказ: они отбираются по индексу наличия продуктов ещё до записи в БД.
+        """
+        if client_coordinates := self.get_coordinates():
+            # Пространственный индекс тянет NumPy, поэтому грузится только при расчёте доставки.
+            from .spatial import get_restaurants_index
+
+            distances = dict(get_restaurants_index().find_nearby(client_coordinates, max_distance))
+        else:
+            distances = dict.fromkeys(Restaurant.objects.values_list('id', flat=True))
+
+        if limit := settings.DELIVERY_CANDIDATES_LIMIT:
+            fulfilling_restaurants_ids = set(get_availability_index().get_restaurants_ids(
+                self.kits.values_list('product_id', flat=True),
+            ))
+
+            def get_priority(candidate):
+                restaurant_id, distance = candidate
+                return restaurant_id not in fulfilling_restaurants_ids, distance is None, distance or 0, restaurant_id
+
+            distances = dict(sorted(distances.items(), key=get_priority)[:limit])
+
+        self.deliveries.exclude(restaurant_id__in=distances).delete()
+
+        deliveries = {delivery.restaurant_id: delivery for delivery in self.deliveries.all()}
+        new_deliveries = []
 
-            if order_products_ids == (order_products_ids & restaurant_products_ids):
-                verified_deliveries.append(delivery)
+        for restaurant_id, distance in distances.items():
+            if not (delivery := deliveries.get(restaurant_id)):
+                delivery = Delivery(order=self, restaurant_id=restaurant_id)
+                new_deliveries.append(delivery)
+                deliveries[restaurant_id] = delivery
 
-        return verified_deliveries
+            delivery.distance = None if distance is None else round(distance)
+
+        Delivery.objects.bulk_create(new_deliveries)
+        Delivery.objects.bulk_update(
+            [delivery for delivery in deliveries.values() if delivery.pk],
+            ['distance'],
+        )
+        self.deliveries.all().update_can_fulfil()
+
+    def are_deliveries_calculating(self) -> bool:
+        try:
+            return self.delivery_job.status == 'pending'
+        except DeliveryJob.DoesNotExist:
+            return False
+
+    def get_verified_deliveries(self) -> list:
+        """
+        Функция возвращает варианты доставки(модель Delivery), в ресторанах которых есть в продаже
+        все продукты из заказа. Проверка хранится в поле Delivery.can_fulfil.
+        """
+        return list(self.deliveries.filter(can_fulfil=True).select_related('restaurant'))
 
     def get_verified_restaurants(self) -> list[Restaurant]:
         """
@@ -328,11 +471,64 @@ class OrderKit(models.Model):
         return f'В заказе "{self.order}" есть "{self.product}" {self.count} шт.'
 
 
+class DeliveryQuerySet(models.QuerySet):
+    def of_open_orders(self):
+        return self.filter(order__preparing_restaurant__isnull=True).exclude(order__status='4 delivered')
+
+    def of_closed_orders(self):
+        """
+        Варианты доставки заказов, которые уже доставлены или переданы в ресторан,
+        кроме варианта самого выбранного ресторана.
+        """
+        return self.filter(
+            models.Q(order__status='4 delivered') | models.Q(order__preparing_restaurant__isnull=False),
+        ).exclude(
+            restaurant=models.F('order__preparing_restaurant'),
+        )
+
+    def update_can_fulfil(self) -> None:
+        """
+        Функция пересчитывает поле can_fulfil у вариантов доставки из выборки тремя запросами:
+        сами варианты, продукты их заказов и наличие этих продуктов в их ресторанах.
+        """
+        deliveries = list(self.only('id', 'order_id', 'restaurant_id', 'can_fulfil'))
+        if not deliveries:
+            return
+
+        orders_products_ids = defaultdict(set)
+        for order_id, product_id in OrderKit.objects.filter(
+            order_id__in={delivery.order_id for delivery in deliveries},
+        ).values_list('order_id', 'product_id'):
+            orders_products_ids[order_id].add(product_id)
+
+        available_menu_items = set(
+            RestaurantMenuItem.objects.filter(
+                restaurant_id__in={delivery.restaurant_id for delivery in deliveries},
+                product_id__in=set().union(*orders_products_ids.values()),
+                availability=True,
+            ).values_list('restaurant_id', 'product_id')
+        )
+
+        changed_deliveries = []
+        for delivery in deliveries:
+            can_fulfil = all(
+                (delivery.restaurant_id, product_id) in available_menu_items
+                for product_id in orders_products_ids[delivery.order_id]
+            )
+            if delivery.can_fulfil != can_fulfil:
+                delivery.can_fulfil = can_fulfil
+                changed_deliveries.append(delivery)
+
+        Delivery.objects.bulk_update(changed_deliveries, ['can_fulfil'])
+        OrderChange.objects.log({delivery.order_id for delivery in changed_deliveries})
+
+
 class Delivery(models.Model):
     """
     Связующая модель между заказом(модель Order) и рестораном(модель Restaurant),
     которая доступна из первичных моделей через атрибут deliveries.
-    Поле distance содержит информацию о расстояние в метрах от ресторана до клиента.
+    Поле distance содержит информацию о расстояние в метрах от ресторана до клиента,
+    а поле can_fulfil — есть ли в ресторане все продукты заказа.
     """
     order = models.ForeignKey(
         Order,
@@ -351,11 +547,24 @@ class Delivery(models.Model):
         default=None,
         null=True,
     )
+    can_fulfil = models.BooleanField(
+        verbose_name='есть все продукты заказа',
+        default=False,
+        db_index=True,
+    )
+
+    objects = DeliveryQuerySet.as_manager()
 
     class Meta:
         ordering = ['distance']
         verbose_name = 'ресторан приготовит продукт из заказа'
         verbose_name_plural = 'рестораны приготовят продукты из заказов'
+        indexes = [
+            models.Index(
+                fields=['order', 'distance'],
+                name='delivery_order_distance_idx',
+            ),
+        ]
 
     def __str__(self):
         if self.distance:
@@ -363,13 +572,402 @@ class Delivery(models.Model):
         else:
             return f'{self.restaurant} - необходимо уточнить адрес!'
 
-    def add_distance(self, max_distance=50000) -> None:
-        client_coordinates = fetch_coordinates(self.order.address)
-        restaurant_coordinates = self.restaurant.get_coordinates()
 
-        if (distance := calculate_distance.distance(restaurant_coordinates, client_coordinates).m) < max_distance:
-            self.distance = distance
+class DeliveryJobQuerySet(models.QuerySet):
+    def ready(self):
+        return self.filter(status='pending', run_after__lte=now())
+
+
+class DeliveryJob(models.Model):
+    """
+    Фоновая задача расчёта вариантов доставки(модель Delivery) заказа.
+    Задачи выполняет команда run_delivery_jobs, неудачные попытки повторяются
+    с экспоненциально растущей задержкой.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'В очереди'),
+        ('done', 'Выполнена'),
+        ('failed', 'Ошибка'),
+    ]
+
+    order = models.OneToOneField(
+        Order,
+        on_delete=models.CASCADE,
+        verbose_name='заказ',
+        related_name='delivery_job',
+    )
+    status = models.CharField(
+        verbose_name='статус',
+        choices=STATUS_CHOICES,
+        default='pending',
+        db_index=True,
+        max_length=10,
+    )
+    attempts = models.PositiveSmallIntegerField(
+        verbose_name='попыток',
+        default=0,
+    )
+    run_after = models.DateTimeField(
+        verbose_name='запустить после',
+        default=now,
+        db_index=True,
+    )
+    error = models.TextField(
+        verbose_name='последняя ошибка',
+        blank=True,
+    )
+    updated_at = models.DateTimeField(
+        verbose_name='обновлена',
+        auto_now=True,
+    )
+
+    objects = DeliveryJobQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'задача расчёта доставки'
+        verbose_name_plural = 'задачи расчёта доставки'
+
+    def __str__(self):
+        return f'Расчёт доставки заказа "{self.order}" - {self.get_status_display()}'
+
+    @classmethod
+    def enqueue(cls, order: Order) -> 'DeliveryJob':
+        job, created = cls.objects.update_or_create(
+            order=order,
+            defaults={
+                'status': 'pending',
+                'attempts': 0,
+                'run_after': now(),
+                'error': '',
+            },
+        )
+        return job
+
+    def run(self) -> None:
+        try:
+            with transaction.atomic():
+                self.order.calculate_deliveries()
+
+        except Exception as error:
+            self.attempts += 1
+            self.error = repr(error)
+
+            if self.attempts >= settings.DELIVERY_JOB_MAX_ATTEMPTS:
+                self.status = 'failed'
+            else:
+                self.run_after = now() + settings.DELIVERY_JOB_RETRY_DELAY * 2 ** (self.attempts - 1)
+
         else:
-            self.distance = None
+            self.status = 'done'
+            self.error = ''
+
+        self.save()
+
+
+class OrderChangeQuerySet(models.QuerySet):
+    def log(self, orders_ids) -> None:
+        self.bulk_create([OrderChange(order_id=order_id) for order_id in orders_ids])
+
+    def get_cursor(self) -> int:
+        return self.aggregate(cursor=Coalesce(models.Max('id'), 0))['cursor']
+
+    def get_settled_cursor(self, settled_at) -> int:
+        """
+        Функция возвращает id последней записи перед первой записью моложе settled_at:
+        записи с меньшим id после него уже не появятся.
+        """
+        first_unsettled_id = self.filter(changed_at__gt=settled_at).order_by('id').values('id')[:1]
+        settled_changes = self.filter(
+            id__lt=Coalesce(models.Subquery(first_unsettled_id), Value(2 ** 63 - 1)),
+        )
+        return settled_changes.get_cursor()
+
+
+class OrderChange(models.Model):
+    """
+    Журнал изменений заказов для страницы менеджера: она запрашивает изменения после
+    известного ей id записи и перерисовывает только изменившиеся заказы.
+    Заказ может быть уже удалён или перенесён в архив, поэтому ссылка на него — простое число.
+    """
+    order_id = models.IntegerField(
+        verbose_name='ID заказа',
+    )
+    changed_at = models.DateTimeField(
+        verbose_name='изменён',
+        default=now,
+        db_index=True,
+    )
+
+    objects = OrderChangeQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'изменение заказа'
+        verbose_name_plural = 'изменения заказов'
+
+    def __str__(self):
+        return f'Заказ {self.order_id} изменён {self.changed_at}'
 
-        self.save(update_fields=['distance'])
+
+class DataVersion(models.Model):
+    """
+    Версии данных, из которых процессы строят индексы и кэши в памяти: рестораны, наличие
+    продуктов, каталог. Версии лежат в БД, поэтому их видят все воркеры и фоновые процессы.
+    """
+    name = models.CharField(
+        verbose_name='данные',
+        max_length=50,
+        primary_key=True,
+    )
+    version = models.PositiveBigIntegerField(
+        verbose_name='версия',
+        default=0,
+    )
+
+    class Meta:
+        verbose_name = 'версия данных'
+        verbose_name_plural = 'версии данных'
+
+    def __str__(self):
+        return f'{self.name}: {self.version}'
+
+
+class ArchivedOrderQuerySet(models.QuerySet):
+    def archive(self, orders: OrderQuerySet) -> int:
+        """
+        Функция переносит заказы вместе с их составами и вариантами доставки в архивные таблицы
+        и удаляет их из рабочих таблиц. Идентификаторы заказов сохраняются.
+
+        Рабочие таблицы очищаются запросом DELETE на таблицу, без каскада и сигналов: сигналы составов
+        пересчитывали бы цены и варианты доставки удаляемых заказов по запросу на каждую строку.
+        Журнал изменений пополняется одним запросом, как это сделал бы сигнал заказа.
+        """
+        orders = list(orders)
+        if not orders:
+            return 0
+
+        orders_ids = [order.id for order in orders]
+        archived_at = now()
+
+        with transaction.atomic():
+            self.bulk_create([
+                ArchivedOrder(
+                    archived_at=archived_at,
+                    **{field: getattr(order, field) for field in ArchivedOrder.ORDER_FIELDS},
+                )
+                for order in orders
+            ])
+            ArchivedOrderKit.objects.bulk_create([
+                ArchivedOrderKit(order_id=order_id, product_id=product_id, count=count, price=price)
+                for order_id, product_id, count, price in OrderKit.objects.filter(
+                    order_id__in=orders_ids,
+                ).values_list('order_id', 'product_id', 'count', 'price')
+            ])
+            ArchivedDelivery.objects.bulk_create([
+                ArchivedDelivery(order_id=order_id, restaurant_id=restaurant_id, distance=distance)
+                for order_id, restaurant_id, distance in Delivery.objects.filter(
+                    order_id__in=orders_ids,
+                ).values_list('order_id', 'restaurant_id', 'distance')
+            ])
+            connection = connections[self.db]
+            placeholders = ', '.join(['%s'] * len(orders_ids))
+            tables = [
+                (OrderKit._meta.db_table, 'order_id'),
+                (Delivery._meta.db_table, 'order_id'),
+                (DeliveryJob._meta.db_table, 'order_id'),
+                (Order._meta.db_table, 'id'),
+            ]
+
+            with connection.cursor() as cursor:
+                for table, column in tables:
+                    cursor.execute(
+                        f'DELETE FROM {connection.ops.quote_name(table)} '
+                        f'WHERE {connection.ops.quote_name(column)} IN ({placeholders})',
+                        orders_ids,
+                    )
+            OrderChange.objects.log(orders_ids)
+
+        return len(orders)
+
+
+class ArchivedOrder(models.Model):
+    """
+    Доставленный заказ(модель Order), перенесённый из рабочей таблицы командой archive_orders.
+    Архивные заказы доступны только для чтения.
+    """
+    ORDER_FIELDS = [
+        'id',
+        'phonenumber',
+        'status',
+        'payment',
+        'price',
+        'firstname',
+        'lastname',
+        'address',
+        'lat',
+        'lon',
+        'geocoding_status',
+        'registered_at',
+        'processed_at',
+        'delivered_at',
+        'comment',
+        'preparing_restaurant_id',
+        'idempotency_key',
+    ]
+
+    id = models.IntegerField(
+        'ID',
+        primary_key=True,
+    )
+    phonenumber = PhoneNumberField(
+        'телефон',
+        db_index=True,
+        region='RU',
+    )
+    status = models.CharField(
+        verbose_name='статус',
+        choices=Order.STATUS_CHOICES,
+        max_length=15,
+    )
+    payment = models.CharField(
+        verbose_name='оплата',
+        choices=Order.PAYMENT_CHOICES,
+        max_length=15,
+    )
+    price = models.DecimalField(
+        verbose_name='стоимость',
+        max_digits=10,
+        decimal_places=2,
+    )
+    firstname = models.CharField(
+        'имя',
+        max_length=50
+    )
+    lastname = models.CharField(
+        'фамилия',
+        max_length=50
+    )
+    address = models.CharField(
+        'адрес доставки',
+        max_length=150,
+        blank=True,
+    )
+    lat = models.DecimalField(
+        verbose_name='широта',
+        decimal_places=6,
+        max_digits=8,
+        null=True,
+    )
+    lon = models.DecimalField(
+        verbose_name='долгота',
+        decimal_places=6,
+        max_digits=9,
+        null=True,
+    )
+    geocoding_status = models.CharField(
+        verbose_name='координаты адреса',
+        choices=Order.GEOCODING_STATUS_CHOICES,
+        default='not geocoded',
+        max_length=15,
+    )
+    registered_at = models.DateTimeField(
+        verbose_name='оформлен',
+        db_index=True,
+    )
+    processed_at = models.DateTimeField(
+        verbose_name='обработан',
+        null=True,
+    )
+    delivered_at = models.DateTimeField(
+        verbose_name='доставлен',
+        null=True,
+    )
+    comment = models.TextField(
+        verbose_name='комментарий',
+        blank=True,
+    )
+    preparing_restaurant = models.ForeignKey(
+        Restaurant,
+        on_delete=models.SET_NULL,
+        verbose_name='Готовился в ресторане',
+        related_name='archived_orders',
+        null=True,
+    )
+    idempotency_key = models.CharField(
+        verbose_name='ключ идемпотентности',
+        max_length=64,
+        unique=True,
+        null=True,
+    )
+    archived_at = models.DateTimeField(
+        verbose_name='перенесён в архив',
+        default=now,
+    )
+
+    objects = ArchivedOrderQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['-registered_at', '-id']
+        verbose_name = 'архивный заказ'
+        verbose_name_plural = 'архив заказов'
+
+    def __str__(self):
+        return f'{self.phonenumber} {self.firstname} {self.lastname}'
+
+
+class ArchivedOrderKit(models.Model):
+    order = models.ForeignKey(
+        ArchivedOrder,
+        on_delete=models.CASCADE,
+        verbose_name='заказ',
+        related_name='kits'
+    )
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.SET_NULL,
+        verbose_name='продукт',
+        related_name='archived_kits',
+        null=True,
+    )
+    count = models.PositiveSmallIntegerField(
+        verbose_name='количество',
+    )
+    price = models.DecimalField(
+        verbose_name='стоимость',
+        max_digits=8,
+        decimal_places=2,
+    )
+
+    class Meta:
+        verbose_name = 'состав архивного заказа'
+        verbose_name_plural = 'составы архивных заказов'
+
+    def __str__(self):
+        return f'В заказе "{self.order}" был "{self.product}" {self.count} шт.'
+
+
+class ArchivedDelivery(models.Model):
+    order = models.ForeignKey(
+        ArchivedOrder,
+        on_delete=models.CASCADE,
+        verbose_name='заказ',
+        related_name='deliveries',
+    )
+    restaurant = models.ForeignKey(
+        Restaurant,
+        on_delete=models.SET_NULL,
+        verbose_name='ресторан',
+        related_name='archived_deliveries',
+        null=True,
+    )
+    distance = models.PositiveIntegerField(
+        verbose_name='расстояние доставки (м)',
+        null=True,
+    )
+
+    class Meta:
+        ordering = ['distance']
+        verbose_name = 'вариант доставки архивного заказа'
+        verbose_name_plural = 'варианты доставки архивных заказов'
+
+    def __str__(self):
+        return f'{self.restaurant} - {self.distance}м.'
@@ -0,0 +1,25 @@
+import json
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+
+class NDJSONParser(BaseParser):
+    """
+    Разбирает NDJSON: по JSON-объекту в строке, пустые строки пропускаются.
+    """
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        items = []
+
+        for line_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+
+            try:
+                items.append(json.loads(line))
+            except ValueError as error:
+                raise ParseError(f'NDJSON parse error in line {line_number}: {error}')
+
+        return items
@@ -1,23 +1,43 @@
+from uuid import uuid4
+
+from django.db import IntegrityError, transaction
+from rest_framework.serializers import CharField
 from rest_framework.serializers import IntegerField
 from rest_framework.serializers import ModelSerializer
 from rest_framework.serializers import ReadOnlyField
+from rest_framework.serializers import ValidationError
 
+from .availability import get_availability_index
+from .models import DeliveryJob
 from .models import Order
+from .models import OrderChange
 from .models import OrderKit
-from .models import Restaurant
+from .models import Product
 
 
 class OrderKitSerializer(ModelSerializer):
-    quantity = IntegerField(source='count')
+    # Продукты всех позиций заказа разом находит OrderSerializer.validate_products.
+    product = IntegerField()
+    quantity = IntegerField(source='count', min_value=1, max_value=32767)
 
     class Meta:
         model = OrderKit
         fields = ['product', 'quantity']
 
 
+def get_orderable_products(products_ids) -> dict[int, Product]:
+    """
+    Функция одним запросом к БД находит продукты, которые продаются хотя бы в одном ресторане.
+    """
+    available_products_ids = get_availability_index().get_available_products_ids(products_ids)
+
+    return Product.objects.in_bulk(available_products_ids)
+
+
 class OrderSerializer(ModelSerializer):
     price = ReadOnlyField()
     products = OrderKitSerializer(many=True, allow_empty=False, write_only=True)
+    idempotency_key = CharField(max_length=64, required=False)
 
     class Meta:
         model = Order
@@ -32,6 +52,7 @@ class OrderSerializer(ModelSerializer):
             'payment',
             'comment',
             'price',
+            'idempotency_key',
         ]
         read_only_fields = [
             'status',
@@ -39,25 +60,151 @@ class OrderSerializer(ModelSerializer):
             'comment',
         ]
 
-    def create(self) -> Order:
-        order = Order.objects.create(
-            phonenumber=self.validated_data['phonenumber'],
-            firstname=self.validated_data['firstname'],
-            lastname=self.validated_data['lastname'],
-            address=self.validated_data['address'],
-        )
+    def validate_products(self, products_notes: list[dict]) -> list[dict]:
+        """
+        Функция одним запросом к БД находит продукты всех позиций заказа и отклоняет заказ,
+        если какого-то продукта нет или он не продаётся ни в одном ресторане.
+        Пачка заказов передаёт уже найденные продукты в контексте products.
+        """
+        products_ids = {product_notes['product'] for product_notes in products_notes}
 
-        OrderKit.objects.bulk_create([
+        if (products := self.context.get('products')) is None:
+            products = get_orderable_products(products_ids)
+
+        if missing_products_ids := sorted(products_ids - products.keys()):
+            raise ValidationError(
+                f'Продукты недоступны для заказа: {", ".join(map(str, missing_products_ids))}'
+            )
+
+        return [
+            {**product_notes, 'product': products[product_notes['product']]}
+            for product_notes in products_notes
+        ]
+
+    @staticmethod
+    def build_order(validated_data: dict) -> tuple[Order, list[OrderKit]]:
+        kits = [
             OrderKit(
-                order=order,
                 product=product_notes['product'],
                 count=product_notes['count'],
                 price=product_notes['product'].price * product_notes['count'],
             )
-            for product_notes in self.validated_data['products']
-        ])
+            for product_notes in validated_data['products']
+        ]
+
+        order = Order(
+            phonenumber=validated_data['phonenumber'],
+            firstname=validated_data['firstname'],
+            lastname=validated_data['lastname'],
+            address=validated_data['address'],
+            price=sum(kit.price for kit in kits),
+            idempotency_key=validated_data.get('idempotency_key'),
+            **{
+                field: validated_data[field]
+                for field in ['lon', 'lat', 'geocoding_status', 'geocoded_at']
+                if field in validated_data
+            },
+        )
+
+        return order, kits
+
+    def create(self, validated_data: dict) -> Order:
+        idempotency_key = validated_data.get('idempotency_key')
+        if idempotency_key and (order := Order.objects.filter(idempotency_key=idempotency_key).first()):
+            return order
+
+        order, kits = self.build_order(validated_data)
+
+        try:
+            with transaction.atomic():
+                order.save()
 
-        for restaurant in Restaurant.objects.iterator():
-            order.deliveries.create(restaurant=restaurant).add_distance()
+                for kit in kits:
+                    kit.order = order
+                OrderKit.objects.bulk_create(kits)
+
+                DeliveryJob.objects.create(order=order)
+
+        except IntegrityError:
+            # Параллельный запрос с тем же ключом успел создать заказ между проверкой и вставкой.
+            if idempotency_key and (order := Order.objects.filter(idempotency_key=idempotency_key).first()):
+                return order
+            raise
 
         return order
+
+
+def register_orders(orders_notes: list) -> list[dict]:
+    """
+    Функция регистрирует пачку заказов: продукты всех заказов ищутся одним запросом,
+    а заказы, их составы и задачи расчёта доставки создаются тремя bulk_create.
+    Ошибка в одном заказе не мешает остальным. Заказ с уже известным ключом идемпотентности
+    не создаётся повторно — в ответе будет ранее созданный заказ.
+    """
+    products_ids = set()
+    for order_notes in orders_notes:
+        if not isinstance(order_notes, dict) or not isinstance(order_notes.get('products'), list):
+            continue
+
+        for product_notes in order_notes['products']:
+            if isinstance(product_notes, dict) and isinstance(product_notes.get('product'), int):
+                products_ids.add(product_notes['product'])
+
+    context = {'products': get_orderable_products(products_ids)}
+
+    results = [{'index': index} for index in range(len(orders_notes))]
+    valid_orders = {}
+
+    for result, order_notes in zip(results, orders_notes):
+        serializer = OrderSerializer(data=order_notes, context=context)
+
+        if not serializer.is_valid():
+            result.update(result='invalid', errors=serializer.errors)
+            continue
+
+        idempotency_key = serializer.validated_data.setdefault('idempotency_key', uuid4().hex)
+        if idempotency_key in valid_orders:
+            result.update(result='invalid', errors={'idempotency_key': ['Ключ повторяется в пачке заказов']})
+            continue
+
+        valid_orders[idempotency_key] = (result, serializer.validated_data)
+
+    for attempt in range(2):
+        try:
+            with transaction.atomic():
+                existing_orders = Order.objects.in_bulk(valid_orders, field_name='idempotency_key')
+                new_orders = [
+                    OrderSerializer.build_order(validated_data)
+                    for idempotency_key, (result, validated_data) in valid_orders.items()
+                    if idempotency_key not in existing_orders
+                ]
+                Order.objects.bulk_create([order for order, kits in new_orders])
+
+                # SQLite не возвращает id созданных строк, поэтому заказы перечитываются по ключам.
+                created_orders = Order.objects.in_bulk(
+                    [order.idempotency_key for order, kits in new_orders],
+                    field_name='idempotency_key',
+                )
+                for order, kits in new_orders:
+                    for kit in kits:
+                        kit.order = created_orders[order.idempotency_key]
+
+                OrderKit.objects.bulk_create([kit for order, kits in new_orders for kit in kits])
+                DeliveryJob.objects.bulk_create([DeliveryJob(order=order) for order in created_orders.values()])
+                OrderChange.objects.log([order.id for order in created_orders.values()])
+            break
+
+        except IntegrityError:
+            # Повторяем с учётом чужих заказов, только если параллельный запрос успел занять один из ключей.
+            # Остальные нарушения ограничений БД — ошибка, которую повтор не исправит.
+            new_keys = [order.idempotency_key for order, kits in new_orders]
+            if attempt or not Order.objects.filter(idempotency_key__in=new_keys).exists():
+                raise
+
+    for idempotency_key, (result, validated_data) in valid_orders.items():
+        if idempotency_key in created_orders:
+            result.update(result='created', order=OrderSerializer(created_orders[idempotency_key]).data)
+        else:
+            result.update(result='exists', order=OrderSerializer(existing_orders[idempotency_key]).data)
+
+    return results
@@ -0,0 +1,77 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .availability import update_availability
+from .models import (
+    Delivery,
+    DeliveryJob,
+    Order,
+    OrderChange,
+    OrderKit,
+    Product,
+    ProductCategory,
+    Restaurant,
+    RestaurantMenuItem,
+)
+from .versions import bump_version
+
+
+@receiver(post_save, sender=Restaurant)
+@receiver(post_delete, sender=Restaurant)
+def update_restaurants_version(sender, **kwargs):
+    transaction.on_commit(lambda: bump_version('restaurants'))
+
+
+@receiver(post_save, sender=RestaurantMenuItem)
+def update_menu_item_availability(sender, instance, **kwargs):
+    update_availability(instance.restaurant_id, instance.product_id, instance.availability)
+    update_restaurant_deliveries(instance)
+
+
+@receiver(post_delete, sender=RestaurantMenuItem)
+def remove_menu_item_availability(sender, instance, **kwargs):
+    update_availability(instance.restaurant_id, instance.product_id, False)
+    update_restaurant_deliveries(instance)
+
+
+def update_restaurant_deliveries(menu_item: RestaurantMenuItem) -> None:
+    Delivery.objects.of_open_orders().filter(
+        restaurant_id=menu_item.restaurant_id,
+        order__kits__product_id=menu_item.product_id,
+    ).update_can_fulfil()
+
+
+@receiver(post_save, sender=OrderKit)
+@receiver(post_delete, sender=OrderKit)
+def update_order_deliveries(sender, instance, **kwargs):
+    Delivery.objects.filter(order_id=instance.order_id).update_can_fulfil()
+
+
+@receiver(post_save, sender=OrderKit)
+@receiver(post_delete, sender=OrderKit)
+def update_order_price(sender, instance, **kwargs):
+    Order.objects.filter(pk=instance.order_id).update_prices()
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+def log_order_change(sender, instance, **kwargs):
+    OrderChange.objects.log([instance.id])
+
+
+@receiver(post_save, sender=OrderKit)
+@receiver(post_delete, sender=OrderKit)
+@receiver(post_save, sender=DeliveryJob)
+def log_order_part_change(sender, instance, **kwargs):
+    OrderChange.objects.log([instance.order_id])
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=ProductCategory)
+@receiver(post_delete, sender=ProductCategory)
+@receiver(post_save, sender=RestaurantMenuItem)
+@receiver(post_delete, sender=RestaurantMenuItem)
+def update_catalog_version(sender, **kwargs):
+    transaction.on_commit(lambda: bump_version('catalog'))
@@ -0,0 +1,102 @@
+import math
+import threading
+from collections import defaultdict
+
+import numpy as np
+
+from .distances import EARTH_RADIUS, calculate_distances
+from .versions import get_version
+
+
+METERS_PER_DEGREE = math.pi * EARTH_RADIUS / 180
+
+
+class RestaurantsIndex:
+    """
+    Сеточный индекс ресторанов: координаты раскладываются по ячейкам cell_size x cell_size градусов,
+    и для поиска просматриваются только ячейки, попадающие в окрестность точки.
+    """
+
+    def __init__(self, restaurants: list[tuple[int, tuple[float, float]]], cell_size: float = 0.5):
+        self.cell_size = cell_size
+        self.ids = np.array([restaurant_id for restaurant_id, coordinates in restaurants], dtype=int)
+        self.coordinates = np.array(
+            [coordinates for restaurant_id, coordinates in restaurants],
+            dtype=float,
+        ).reshape(-1, 2)
+        self.cells = defaultdict(list)
+
+        for position, (lon, lat) in enumerate(self.coordinates):
+            self.cells[self.get_cell(lon, lat)].append(position)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def get_cell(self, lon: float, lat: float) -> tuple[int, int]:
+        return math.floor(lon / self.cell_size), math.floor(lat / self.cell_size)
+
+    def find_nearby(self, coordinates: tuple[float, float], radius: float) -> list[tuple[int, float]]:
+        """
+        Функция возвращает пары (id ресторана, расстояние в метрах) для ресторанов
+        в радиусе radius метров от точки (lon, lat), отсортированные по расстоянию.
+        """
+        lon, lat = map(float, coordinates)
+        lat_delta = radius / METERS_PER_DEGREE
+        lon_delta = lat_delta / max(math.cos(math.radians(min(abs(lat) + lat_delta, 90))), 1e-6)
+
+        min_x, min_y = self.get_cell(lon - min(lon_delta, 180), lat - lat_delta)
+        max_x, max_y = self.get_cell(lon + min(lon_delta, 180), lat + lat_delta)
+
+        positions = [
+            position
+            for x in range(min_x, max_x + 1)
+            for y in range(min_y, max_y + 1)
+            for position in self.cells.get((x, y), [])
+        ]
+        if not positions:
+            return []
+
+        positions = np.array(positions)
+        distances = calculate_distances((lon, lat), self.coordinates[positions])
+        nearby = distances <= radius
+        order = np.argsort(distances[nearby], kind='stable')
+
+        return list(zip(
+            self.ids[positions][nearby][order].tolist(),
+            distances[nearby][order].tolist(),
+        ))
+
+
+_index = None
+_index_version = None
+_index_lock = threading.Lock()
+
+
+def build_restaurants_index() -> RestaurantsIndex:
+    from .models import Restaurant
+
+    # Индекс строится только из сохранённых координат: их определяют upload_restaurants
+    # и сохранение ресторана в админке, а не каждый процесс при перестройке индекса.
+    restaurants = Restaurant.objects.using('default').filter(
+        lon__isnull=False,
+        lat__isnull=False,
+    ).values_list('id', 'lon', 'lat')
+
+    return RestaurantsIndex([(restaurant_id, (lon, lat)) for restaurant_id, lon, lat in restaurants])
+
+
+def get_restaurants_index() -> RestaurantsIndex:
+    """
+    Функция возвращает индекс ресторанов текущего процесса.
+    Индекс перестраивается, когда сигналы модели Restaurant меняют версию 'restaurants'.
+    """
+    global _index, _index_version
+
+    version = get_version('restaurants')
+
+    with _index_lock:
+        if _index is None or _index_version != version:
+            _index = build_restaurants_index()
+            _index_version = version
+
+        return _index
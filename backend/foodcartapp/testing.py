@@ -0,0 +1,126 @@
+"""
+Общие для тестов и нагрузочных команд фабрики данных и заглушка геокодера Яндекса.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from .models import Delivery, DeliveryJob, Order, OrderKit, Product, Restaurant, RestaurantMenuItem
+
+
+STUB_COORDINATES = (37.617635, 55.755814)
+
+
+class StubGeocoderHandler(BaseHTTPRequestHandler):
+    """
+    Заглушка геокодера Яндекса: отвечает точкой STUB_COORDINATES с задержкой delay секунд.
+    Первые failures запросов получают ошибку 503, адреса со словом «Нигде» не находятся.
+    Запрошенные адреса складываются в список requested_addresses.
+    """
+    delay = 0.2
+    failures = 0
+    requested_addresses = []
+
+    def do_GET(self):
+        address = parse_qs(urlparse(self.path).query).get('geocode', [''])[0]
+        self.requested_addresses.append(address)
+
+        if len(self.requested_addresses) <= self.failures:
+            self.send_error(503)
+            return
+
+        time.sleep(self.delay)
+
+        found_places = []
+        if 'Нигде' not in address:
+            lon, lat = STUB_COORDINATES
+            found_places.append({'GeoObject': {'Point': {'pos': f'{lon} {lat}'}}})
+
+        content = json.dumps({'response': {'GeoObjectCollection': {'featureMember': found_places}}}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_geocoder(delay: float = 0, failures: int = 0,
+                        requested_addresses: list = None) -> ThreadingHTTPServer:
+    """
+    Функция запускает заглушку геокодера в отдельном потоке на свободном порту.
+    Остановить её — server.shutdown() и server.server_close().
+    """
+    handler = type('StubGeocoderHandler', (StubGeocoderHandler,), {
+        'delay': delay,
+        'failures': failures,
+        'requested_addresses': [] if requested_addresses is None else requested_addresses,
+    })
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    return server
+
+
+def create_menu(restaurants_count: int = 3, products_count: int = 1,
+                **restaurant_fields) -> tuple[list[Restaurant], list[Product]]:
+    """
+    Функция создаёт рестораны, в каждом из которых продаются все созданные продукты.
+    """
+    restaurants = [
+        Restaurant.objects.create(name=f'Ресторан {number}', address=f'Адрес {number}', **restaurant_fields)
+        for number in range(restaurants_count)
+    ]
+    products = [
+        Product.objects.create(name=f'Бургер {number}', price=100 + number, image='burger.jpg')
+        for number in range(products_count)
+    ]
+
+    for restaurant in restaurants:
+        for product in products:
+            RestaurantMenuItem.objects.create(restaurant=restaurant, product=product)
+
+    return restaurants, products
+
+
+def create_orders(count: int, product: Product, restaurants: list[Restaurant], **fields) -> list[Order]:
+    """
+    Функция создаёт заказы из одного продукта с рассчитанной доставкой из всех ресторанов за 1 км.
+    """
+    orders = []
+
+    for number in range(count):
+        order = Order.objects.create(
+            phonenumber='+79161234567',
+            firstname='Иван',
+            lastname=f'Иванов {number}',
+            address='Москва',
+            **fields,
+        )
+        OrderKit.objects.create(order=order, product=product, count=1, price=product.price)
+        DeliveryJob.objects.create(order=order, status='done')
+        Delivery.objects.bulk_create([
+            Delivery(order=order, restaurant=restaurant, distance=1000, can_fulfil=True)
+            for restaurant in restaurants
+        ])
+        orders.append(order)
+
+    return orders
+
+
+def make_order_notes(products_ids: list[int], quantity: int = 1, **fields) -> dict:
+    """
+    Функция возвращает заказ в формате API оформления заказа.
+    """
+    return {
+        'firstname': 'Иван',
+        'lastname': 'Иванов',
+        'phonenumber': '+79161234567',
+        'address': 'Москва',
+        'products': [{'product': product_id, 'quantity': quantity} for product_id in products_ids],
+        **fields,
+    }
@@ -0,0 +1,775 @@
+import json
+import time
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from tempfile import NamedTemporaryFile
+from unittest.mock import patch
+
+import numpy as np
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db.models import QuerySet
+from django.test import AsyncClient, TestCase, override_settings
+from django.urls import reverse
+from django.utils.timezone import now
+
+from places.models import Place
+
+from . import availability, geocoder, spatial
+from .availability import get_availability_index
+from .dispatch import CostMatrix, apply_dispatch, plan_dispatch
+from .geocoder import GeocoderError, cache_stats, geocode, geocode_many
+from .models import (
+    ArchivedOrder, Delivery, DeliveryJob, Order, OrderChange, OrderKit, Product, Restaurant, RestaurantMenuItem,
+)
+from .serializers import OrderSerializer
+from .spatial import get_restaurants_index
+from .testing import STUB_COORDINATES, create_menu, create_orders, make_order_notes, start_stub_geocoder
+from .versions import bump_version, get_version
+from .views import geocode_order_address
+
+
+class IndexesTestCase(TestCase):
+    def setUp(self):
+        # Версии в БД откатываются вместе с транзакцией теста, а индексы процесса остаются:
+        # без сброса тест мог бы взять индекс прошлого теста с той же версией.
+        availability._index = spatial._index = None
+        cache.clear()
+
+
+class VersionsTest(IndexesTestCase):
+    def test_bump_version(self):
+        self.assertEqual(get_version('test'), 0)
+        self.assertEqual(bump_version('test'), 1)
+        self.assertEqual(bump_version('test'), 2)
+        self.assertEqual(get_version('test'), 2)
+
+    def test_restaurants_index_follows_version_from_other_process(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            restaurant = Restaurant.objects.create(name='Ресторан', address='Москва', lon=37.6, lat=55.7)
+
+        self.assertEqual(get_restaurants_index().find_nearby((37.6, 55.7), 1000)[0][0], restaurant.id)
+
+        # Другой процесс удалил ресторан: в этом процессе сигнал не сработал, видна только новая версия.
+        Restaurant.objects.filter(id=restaurant.id).delete()
+        bump_version('restaurants')
+
+        self.assertEqual(get_restaurants_index().find_nearby((37.6, 55.7), 1000), [])
+
+    def test_availability_index_follows_version_from_other_process(self):
+        restaurant = Restaurant.objects.create(name='Ресторан', address='Москва')
+        product = Product.objects.create(name='Бургер', price=100, image='burger.jpg')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            menu_item = RestaurantMenuItem.objects.create(restaurant=restaurant, product=product)
+
+        self.assertEqual(get_availability_index().get_restaurants_ids([product.id]), [restaurant.id])
+
+        RestaurantMenuItem.objects.filter(id=menu_item.id).update(availability=False)
+        bump_version('availability')
+
+        self.assertEqual(get_availability_index().get_restaurants_ids([product.id]), [])
+
+        # Пока этот процесс сохранял меню, другой процесс тоже сменил версию: индекс строится заново.
+        with self.captureOnCommitCallbacks(execute=True):
+            menu_item.availability = True
+            menu_item.save()
+            bump_version('availability')
+
+        self.assertEqual(get_availability_index().get_restaurants_ids([product.id]), [restaurant.id])
+
+    def test_upload_products_bumps_versions(self):
+        restaurant = Restaurant.objects.create(name='Ресторан', address='Москва')
+        get_availability_index()
+
+        with NamedTemporaryFile('w', suffix='.json') as file:
+            json.dump([{'title': 'Бургер', 'price': 100, 'img': 'burger.jpg', 'type': 'Бургеры'}], file)
+            file.flush()
+
+            with self.captureOnCommitCallbacks(execute=True):
+                call_command('upload_products', file.name, stdout=StringIO())
+
+        self.assertEqual(get_version('catalog'), 1)
+        product = Product.objects.get(name='Бургер')
+        self.assertEqual(get_availability_index().get_restaurants_ids([product.id]), [restaurant.id])
+
+    def test_upload_restaurants_bumps_version(self):
+        get_restaurants_index()
+
+        with NamedTemporaryFile('w', suffix='.json') as file:
+            json.dump([{'title': 'Ресторан', 'address': 'Москва', 'contact_phone': ''}], file)
+            file.flush()
+
+            geocode_many = 'foodcartapp.management.commands.upload_restaurants.geocode_many'
+            with patch(geocode_many, return_value={'Москва': (37.6, 55.7)}):
+                call_command('upload_restaurants', file.name, stdout=StringIO())
+
+        restaurant = Restaurant.objects.get(name='Ресторан')
+        self.assertEqual(get_restaurants_index().find_nearby((37.6, 55.7), 1000)[0][0], restaurant.id)
+
+
+class RestaurantsIndexTest(IndexesTestCase):
+    def test_index_uses_stored_coordinates_only(self):
+        located_restaurant = Restaurant.objects.create(name='Ресторан', address='Москва', lon=37.6, lat=55.7)
+        Restaurant.objects.create(name='Без координат', address='Москва')
+
+        with patch('foodcartapp.models.fetch_coordinates') as fetch_coordinates, \
+                self.assertNumQueries(2):
+            index = get_restaurants_index()
+
+        fetch_coordinates.assert_not_called()
+        self.assertEqual(index.ids.tolist(), [located_restaurant.id])
+
+    def test_admin_geocodes_changed_address(self):
+        admin = User.objects.create_superuser('admin', password='admin')
+        self.client.force_login(admin)
+
+        with patch('foodcartapp.models.fetch_coordinates', return_value=(37.6, 55.7)) as fetch_coordinates:
+            self.client.post(reverse('admin:foodcartapp_restaurant_add'), {
+                'name': 'Ресторан',
+                'address': 'Москва',
+                'contact_phone': '',
+                'menu_items-TOTAL_FORMS': 0,
+                'menu_items-INITIAL_FORMS': 0,
+            })
+
+        fetch_coordinates.assert_called_once_with('Москва')
+        self.assertEqual(Restaurant.objects.get().get_coordinates(), (Decimal('37.6'), Decimal('55.7')))
+
+
+class CatalogTest(IndexesTestCase):
+    def test_catalog_follows_version_from_other_process(self):
+        restaurant = Restaurant.objects.create(name='Ресторан', address='Москва')
+        product = Product.objects.create(name='Бургер', price=100, image='burger.jpg')
+        RestaurantMenuItem.objects.create(restaurant=restaurant, product=product)
+
+        response = self.client.get('/api/products/')
+        self.assertEqual([product['name'] for product in response.json()], ['Бургер'])
+
+        Product.objects.filter(id=product.id).update(name='Чизбургер')
+        response = self.client.get('/api/products/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+        bump_version('catalog')
+        response = self.client.get('/api/products/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual([product['name'] for product in response.json()], ['Чизбургер'])
+
+
+class OrderSerializerTest(IndexesTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        (restaurant,), cls.products = create_menu(restaurants_count=1, products_count=20)
+
+        cls.unavailable_product = Product.objects.create(name='Снят с продажи', price=100, image='burger.jpg')
+        RestaurantMenuItem.objects.create(restaurant=restaurant, product=cls.unavailable_product, availability=False)
+
+    def test_products_are_found_with_one_query(self):
+        get_availability_index()
+
+        for products in [self.products[:1], self.products]:
+            serializer = OrderSerializer(data=make_order_notes([product.id for product in products]))
+            # Версия индекса наличия и сами продукты, сколько бы позиций ни было в заказе.
+            with self.assertNumQueries(2):
+                self.assertTrue(serializer.is_valid())
+
+    def test_unknown_and_unavailable_products(self):
+        unknown_product_id = self.unavailable_product.id + 1
+        serializer = OrderSerializer(data=make_order_notes(
+            [self.products[0].id, self.unavailable_product.id, unknown_product_id],
+        ))
+
+        self.assertFalse(serializer.is_valid())
+        self.assertEqual(
+            serializer.errors['products'],
+            [f'Продукты недоступны для заказа: {self.unavailable_product.id}, {unknown_product_id}'],
+        )
+
+    def test_response_does_not_requery_order(self):
+        serializer = OrderSerializer(data=make_order_notes([product.id for product in self.products[:3]], quantity=2))
+        self.assertTrue(serializer.is_valid())
+        serializer.save()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(Decimal(serializer.data['price']), (100 + 101 + 102) * 2)
+
+    def test_concurrent_idempotency_key(self):
+        notes = make_order_notes([self.products[0].id], idempotency_key='order-1')
+        first_serializer = OrderSerializer(data=notes)
+        second_serializer = OrderSerializer(data=notes)
+        self.assertTrue(first_serializer.is_valid())
+        self.assertTrue(second_serializer.is_valid())
+
+        existing_order = first_serializer.save()
+
+        # Второй запрос проверял ключ до того, как первый сохранил заказ.
+        first = QuerySet.first
+        lookups = []
+
+        def first_after_race(queryset):
+            lookups.append(queryset)
+            return None if len(lookups) == 1 else first(queryset)
+
+        with patch.object(QuerySet, 'first', first_after_race):
+            order = second_serializer.save()
+
+        self.assertEqual(order.id, existing_order.id)
+        self.assertEqual(Order.objects.count(), 1)
+
+
+class OrdersBatchTest(IndexesTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        restaurants, (cls.product,) = create_menu(restaurants_count=1)
+
+    def make_order_notes(self, **fields):
+        return make_order_notes([self.product.id], **fields)
+
+    def post_batch(self, orders_notes):
+        response = self.client.post('/api/orders/batch/', orders_notes, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+
+        return [result['result'] for result in response.json()]
+
+    def test_invalid_orders_do_not_break_batch(self):
+        results = self.post_batch([
+            self.make_order_notes(),
+            self.make_order_notes(quantity=-1),
+            self.make_order_notes(quantity=0),
+            self.make_order_notes(products=[{'product': self.product.id + 1, 'quantity': 1}]),
+        ])
+
+        self.assertEqual(results, ['created', 'invalid', 'invalid', 'invalid'])
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_duplicate_keys_in_batch(self):
+        results = self.post_batch([
+            self.make_order_notes(idempotency_key='order-1'),
+            self.make_order_notes(idempotency_key='order-1'),
+        ])
+
+        self.assertEqual(results, ['created', 'invalid'])
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_replayed_keys(self):
+        orders_notes = [
+            self.make_order_notes(idempotency_key='order-1'),
+            self.make_order_notes(idempotency_key='order-2'),
+        ]
+        self.assertEqual(self.post_batch(orders_notes), ['created', 'created'])
+
+        orders_notes.append(self.make_order_notes(idempotency_key='order-3'))
+        self.assertEqual(self.post_batch(orders_notes), ['exists', 'exists', 'created'])
+        self.assertEqual(Order.objects.count(), 3)
+
+
+class GeocoderTestCase(IndexesTestCase):
+    """
+    Геокодер на заглушке Яндекса в отдельном потоке: она отвечает точкой STUB_COORDINATES
+    через delay секунд, а первые failures запросов — ошибкой 503.
+    """
+    delay = 0
+    failures = 0
+
+    def setUp(self):
+        super().setUp()
+        self.requested_addresses = []
+        stub_server = start_stub_geocoder(self.delay, self.failures, self.requested_addresses)
+        self.addCleanup(stub_server.server_close)
+        self.addCleanup(stub_server.shutdown)
+
+        stub_settings = override_settings(
+            GEOCODER_URL=f'http://127.0.0.1:{stub_server.server_port}/',
+            GEOCODER_RATE_LIMIT=0,
+            GEOCODER_BREAKER_THRESHOLD=2,
+        )
+        stub_settings.enable()
+        self.addCleanup(stub_settings.disable)
+
+        geocoder.get_geocoder.cache_clear()
+        geocoder.places_cache.clear()
+        cache_stats.clear()
+        self.addCleanup(geocoder.get_geocoder.cache_clear)
+        self.addCleanup(geocoder.places_cache.clear)
+
+
+class GeocoderCacheTest(GeocoderTestCase):
+    def test_cache_hits(self):
+        self.assertEqual(geocode('Москва, Тверская 1'), STUB_COORDINATES)
+        self.assertEqual(geocode('  москва тверская 1 '), STUB_COORDINATES)
+
+        geocoder.places_cache.clear()
+        self.assertEqual(geocode('Москва, Тверская 1'), STUB_COORDINATES)
+
+        self.assertEqual(self.requested_addresses, ['Москва, Тверская 1'])
+        self.assertEqual(cache_stats, {'misses': 1, 'memory_hits': 1, 'db_hits': 1})
+
+    def test_not_found_addresses_are_cached(self):
+        self.assertIsNone(geocode('Нигде'))
+        self.assertIsNone(geocode('Нигде'))
+
+        self.assertEqual(self.requested_addresses, ['Нигде'])
+        self.assertIsNone(Place.objects.get(address='нигде').get_coordinates())
+
+    def test_expiration(self):
+        geocode('Москва, Тверская 1')
+        geocode('Нигде')
+
+        # Ненайденный адрес запрашивается снова раньше найденного.
+        later = now() + settings.GEOCODER_NEGATIVE_CACHE_TTL + timedelta(minutes=1)
+        with patch('foodcartapp.geocoder.now', return_value=later):
+            geocode('Москва, Тверская 1')
+            geocode('Нигде')
+
+        self.assertEqual(self.requested_addresses, ['Москва, Тверская 1', 'Нигде', 'Нигде'])
+
+        geocoder.places_cache.clear()
+        later = now() + settings.GEOCODER_CACHE_TTL + timedelta(minutes=1)
+        with patch('foodcartapp.geocoder.now', return_value=later):
+            geocode('Москва, Тверская 1')
+
+        self.assertEqual(self.requested_addresses[-1], 'Москва, Тверская 1')
+        self.assertEqual(len(self.requested_addresses), 4)
+
+    def test_geocode_many(self):
+        geocode('Москва, Тверская 1')
+
+        coordinates = geocode_many(['Москва, Тверская 1', 'Москва, Тверская 2', 'Нигде', ''])
+
+        self.assertEqual(coordinates, {
+            'Москва, Тверская 1': STUB_COORDINATES,
+            'Москва, Тверская 2': STUB_COORDINATES,
+            'Нигде': None,
+            '': None,
+        })
+        self.assertEqual(sorted(self.requested_addresses), ['Москва, Тверская 1', 'Москва, Тверская 2', 'Нигде'])
+
+
+class CheckoutApiTest(GeocoderTestCase):
+    def setUp(self):
+        super().setUp()
+        _, (self.product,) = create_menu(restaurants_count=1)
+
+    async def post_order(self, data):
+        return await AsyncClient().post('/api/order/', data, content_type='application/json')
+
+    async def test_register_order(self):
+        response = await self.post_order(make_order_notes([self.product.id], quantity=2))
+
+        self.assertEqual(response.status_code, 200)
+        order = await sync_to_async(Order.objects.get)()
+        self.assertEqual(response.json()['id'], order.id)
+        self.assertEqual(order.price, 200)
+        self.assertEqual(order.geocoding_status, 'found')
+        self.assertEqual((float(order.lon), float(order.lat)), STUB_COORDINATES)
+        self.assertEqual(self.requested_addresses, ['Москва'])
+
+    async def test_validation_error(self):
+        response = await self.post_order(make_order_notes([]))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('products', response.json())
+        self.assertFalse(await sync_to_async(Order.objects.exists)())
+        self.assertEqual(self.requested_addresses, [])
+
+    async def test_invalid_json(self):
+        response = await self.post_order('{"firstname": ')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(response.json()['detail'].startswith('JSON parse error'))
+
+
+class FailingGeocoderTest(GeocoderTestCase):
+    failures = 2
+
+    @override_settings(GEOCODER_RETRIES=2)
+    def test_server_errors_are_retried(self):
+        self.assertEqual(geocode('Москва, Тверская 1'), STUB_COORDINATES)
+        self.assertEqual(len(self.requested_addresses), 3)
+
+    @override_settings(GEOCODER_RETRIES=0, GEOCODER_BREAKER_RESET_SECONDS=0.1)
+    def test_circuit_breaker(self):
+        for address in ['Москва, Тверская 1', 'Москва, Тверская 2', 'Москва, Тверская 3']:
+            with self.assertRaises(GeocoderError):
+                geocode(address)
+
+        # Третий адрес не запрашивался: цепь разомкнута после двух сбоев подряд. Ошибки не кэшируются.
+        self.assertEqual(len(self.requested_addresses), 2)
+        self.assertFalse(Place.objects.exists())
+
+        time.sleep(0.15)
+        self.assertEqual(geocode('Москва, Тверская 3'), STUB_COORDINATES)
+        self.assertTrue(geocoder.get_geocoder().breaker.allow())
+
+
+class HangingGeocoderTest(GeocoderTestCase):
+    delay = 1
+
+    @override_settings(GEOCODER_READ_TIMEOUT=0.05, GEOCODER_RETRIES=0)
+    def test_read_timeout(self):
+        started_at = time.monotonic()
+
+        with self.assertRaises(GeocoderError):
+            geocode('Москва, Тверская 1')
+
+        self.assertLess(time.monotonic() - started_at, 0.5)
+
+    @override_settings(ORDER_GEOCODING_TIMEOUT=0.05)
+    async def test_checkout_saves_order_on_timeout(self):
+        _, (product,) = await sync_to_async(create_menu)(restaurants_count=1)
+
+        response = await AsyncClient().post(
+            '/api/order/',
+            make_order_notes([product.id]),
+            content_type='application/json',
+        )
+
+        self.assertEqual(response.status_code, 200)
+        order = await sync_to_async(Order.objects.get)()
+        self.assertEqual(order.geocoding_status, 'not geocoded')
+        self.assertIsNone(order.lon)
+        self.assertIsNone(order.geocoded_at)
+
+    @override_settings(ORDER_GEOCODING_TIMEOUT=0.05)
+    def test_checkout_timeouts_open_circuit(self):
+        self.assertEqual(async_to_sync(geocode_order_address)('Москва, Тверская 1'), {})
+        self.assertTrue(geocoder.get_geocoder().breaker.allow())
+
+        self.assertEqual(async_to_sync(geocode_order_address)('Москва, Тверская 2'), {})
+        self.assertFalse(geocoder.get_geocoder().breaker.allow())
+
+
+class OrdersTestCase(IndexesTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.restaurants, (cls.product,) = create_menu(lon=Decimal('131.885485'), lat=Decimal('43.115542'))
+
+    def create_orders(self, count, **fields):
+        return create_orders(count, self.product, self.restaurants, **fields)
+
+
+class CanFulfilTest(OrdersTestCase):
+    def get_can_fulfil(self, order):
+        return dict(order.deliveries.values_list('restaurant_id', 'can_fulfil'))
+
+    def test_menu_item_availability(self):
+        open_order, = self.create_orders(1)
+        delivered_order, = self.create_orders(1, status='4 delivered')
+        first_restaurant, *other_restaurants = self.restaurants
+        menu_item = RestaurantMenuItem.objects.get(restaurant=first_restaurant, product=self.product)
+        cursor = OrderChange.objects.get_cursor()
+
+        menu_item.availability = False
+        menu_item.save()
+
+        self.assertEqual(self.get_can_fulfil(open_order), {
+            first_restaurant.id: False,
+            **{restaurant.id: True for restaurant in other_restaurants},
+        })
+        self.assertTrue(all(self.get_can_fulfil(delivered_order).values()))
+        self.assertEqual(
+            list(OrderChange.objects.filter(id__gt=cursor).values_list('order_id', flat=True)),
+            [open_order.id],
+        )
+
+        menu_item.availability = True
+        menu_item.save()
+
+        self.assertTrue(all(self.get_can_fulfil(open_order).values()))
+
+    def test_menu_item_deletion(self):
+        open_order, = self.create_orders(1)
+        assigned_order, = self.create_orders(1, preparing_restaurant=self.restaurants[1])
+
+        RestaurantMenuItem.objects.get(restaurant=self.restaurants[0], product=self.product).delete()
+
+        self.assertFalse(self.get_can_fulfil(open_order)[self.restaurants[0].id])
+        self.assertTrue(all(self.get_can_fulfil(assigned_order).values()))
+
+    def test_order_kits(self):
+        order, = self.create_orders(1)
+        rare_product = Product.objects.create(name='Редкий бургер', price=500, image='burger.jpg')
+        RestaurantMenuItem.objects.create(restaurant=self.restaurants[0], product=rare_product)
+
+        rare_kit = OrderKit.objects.create(order=order, product=rare_product, count=1, price=rare_product.price)
+
+        self.assertEqual(self.get_can_fulfil(order), {
+            restaurant.id: restaurant == self.restaurants[0]
+            for restaurant in self.restaurants
+        })
+
+        rare_kit.delete()
+
+        self.assertTrue(all(self.get_can_fulfil(order).values()))
+
+
+class OrderPriceTest(OrdersTestCase):
+    def test_price_follows_kits(self):
+        order, = self.create_orders(1)
+        self.assertEqual(Order.objects.get(id=order.id).price, 100)
+
+        kit = OrderKit.objects.create(order=order, product=self.product, count=2, price=200)
+        self.assertEqual(Order.objects.get(id=order.id).price, 300)
+
+        kit.price = 300
+        kit.save()
+        self.assertEqual(Order.objects.get(id=order.id).price, 400)
+
+        kit.delete()
+        self.assertEqual(Order.objects.get(id=order.id).price, 100)
+
+    def test_admin_recalculates_kits_prices(self):
+        order, = self.create_orders(1)
+        kit = order.kits.get()
+        self.client.force_login(User.objects.create_superuser('admin', password='admin'))
+
+        url = reverse('admin:foodcartapp_order_change', args=(order.id,))
+        response = self.client.post(f'{url}?next=/', {
+            'status': order.status,
+            'payment': order.payment,
+            'price': order.price,
+            'firstname': order.firstname,
+            'lastname': order.lastname,
+            'phonenumber': order.phonenumber,
+            'address': order.address,
+            'registered_at_0': order.registered_at.strftime('%Y-%m-%d'),
+            'registered_at_1': order.registered_at.strftime('%H:%M:%S'),
+            'kits-TOTAL_FORMS': 1,
+            'kits-INITIAL_FORMS': 1,
+            'kits-0-id': kit.id,
+            'kits-0-order': order.id,
+            'kits-0-product': self.product.id,
+            'kits-0-count': 3,
+        })
+
+        self.assertRedirects(response, '/', fetch_redirect_response=False)
+        self.assertEqual(OrderKit.objects.get(id=kit.id).price, 300)
+        self.assertEqual(Order.objects.get(id=order.id).price, 300)
+
+    def test_check_order_prices(self):
+        drifted_order, matching_order = self.create_orders(2)
+        Order.objects.filter(id=drifted_order.id).update(price=1)
+
+        stdout = StringIO()
+        call_command('check_order_prices', stdout=stdout)
+
+        self.assertIn(f'order {drifted_order.id} costs 1', stdout.getvalue())
+        self.assertNotIn(f'order {matching_order.id} ', stdout.getvalue())
+        self.assertEqual(Order.objects.get(id=drifted_order.id).price, 1)
+
+        stdout = StringIO()
+        call_command('check_order_prices', '--fix', stdout=stdout)
+
+        self.assertIn('Fixed 1 order prices.', stdout.getvalue())
+        self.assertEqual(Order.objects.get(id=drifted_order.id).price, 100)
+
+        stdout = StringIO()
+        call_command('check_order_prices', stdout=stdout)
+        self.assertEqual(stdout.getvalue().strip(), 'All order prices match their kits.')
+
+
+class DeliveryCandidatesTest(OrdersTestCase):
+    def setUp(self):
+        super().setUp()
+        # Рестораны удаляются от клиента по порядку: на 0, 100 и 200 метров к северу.
+        for number, restaurant in enumerate(self.restaurants):
+            restaurant.lat = Decimal('43.115542') + Decimal('0.0009') * number
+            restaurant.save()
+
+        self.order, = self.create_orders(
+            1,
+            lon=Decimal('131.885485'),
+            lat=Decimal('43.115542'),
+            geocoding_status='found',
+        )
+        self.order.deliveries.all().delete()
+
+    def get_deliveries(self):
+        return list(self.order.deliveries.order_by('distance').values_list('restaurant_id', 'can_fulfil'))
+
+    @override_settings(DELIVERY_CANDIDATES_LIMIT=2)
+    def test_nearest_fulfilling_candidates_are_kept(self):
+        nearest_restaurant, *other_restaurants = self.restaurants
+        RestaurantMenuItem.objects.filter(restaurant=nearest_restaurant).update(availability=False)
+        availability._index = None
+
+        with patch.object(Delivery.objects, 'bulk_create', wraps=Delivery.objects.bulk_create) as bulk_create:
+            self.order.calculate_deliveries()
+
+        self.assertEqual(len(bulk_create.call_args.args[0]), 2)
+        self.assertEqual(self.get_deliveries(), [(restaurant.id, True) for restaurant in other_restaurants])
+
+        RestaurantMenuItem.objects.filter(restaurant=nearest_restaurant).update(availability=True)
+        availability._index = None
+        self.order.calculate_deliveries()
+
+        self.assertEqual(self.get_deliveries(), [(restaurant.id, True) for restaurant in self.restaurants[:2]])
+
+    def test_compact_deliveries_keeps_chosen_restaurant(self):
+        self.order.calculate_deliveries()
+        chosen_restaurant = self.restaurants[1]
+        self.order.preparing_restaurant = chosen_restaurant
+        self.order.save()
+        open_order, = self.create_orders(1)
+
+        call_command('compact_deliveries', stdout=StringIO())
+
+        self.assertEqual(list(self.order.deliveries.values_list('restaurant_id', flat=True)), [chosen_restaurant.id])
+        self.assertEqual(open_order.deliveries.count(), 3)
+
+
+class ArchiveTest(OrdersTestCase):
+    def test_archive(self):
+        delivered_order, = self.create_orders(
+            1,
+            status='4 delivered',
+            idempotency_key='checkout-1',
+            lon=Decimal('131.885485'),
+            lat=Decimal('43.115542'),
+            geocoding_status='found',
+        )
+        open_order, = self.create_orders(1)
+
+        self.assertEqual(ArchivedOrder.objects.archive(Order.objects.filter(status='4 delivered')), 1)
+        self.assertFalse(Order.objects.filter(id=delivered_order.id).exists())
+        self.assertTrue(Order.objects.filter(id=open_order.id).exists())
+
+        archived_order = ArchivedOrder.objects.get(id=delivered_order.id)
+        self.assertEqual(archived_order.kits.count(), 1)
+        self.assertEqual(archived_order.deliveries.count(), 3)
+        self.assertEqual(archived_order.idempotency_key, delivered_order.idempotency_key)
+        self.assertEqual(archived_order.geocoding_status, 'found')
+        self.assertEqual((archived_order.lon, archived_order.lat), (Decimal('131.885485'), Decimal('43.115542')))
+        self.assertFalse(OrderKit.objects.filter(order_id=delivered_order.id).exists())
+        self.assertFalse(Delivery.objects.filter(order_id=delivered_order.id).exists())
+        self.assertTrue(OrderChange.objects.filter(order_id=delivered_order.id).exists())
+
+    def test_archive_queries_do_not_grow_with_orders(self):
+        self.create_orders(10, status='4 delivered')
+
+        # Выборка заказов, выборки и вставки в три архивные таблицы, четыре удаления,
+        # запись журнала и точка сохранения — сколько бы заказов ни переносилось.
+        with self.assertNumQueries(13):
+            ArchivedOrder.objects.archive(Order.objects.filter(status='4 delivered'))
+
+
+@override_settings(DELIVERY_JOB_MAX_ATTEMPTS=3, DELIVERY_JOB_RETRY_DELAY=timedelta(seconds=30))
+class DeliveryJobTest(OrdersTestCase):
+    def create_located_order(self):
+        order, = self.create_orders(
+            1,
+            lon=Decimal('131.885485'),
+            lat=Decimal('43.115542'),
+            geocoding_status='found',
+        )
+        order.deliveries.all().delete()
+        return order
+
+    def test_failed_attempts_back_off(self):
+        job = DeliveryJob.enqueue(self.create_located_order())
+
+        with patch.object(Order, 'calculate_deliveries', side_effect=GeocoderError('Геокодер недоступен')):
+            for attempt, delay in [(1, 30), (2, 60)]:
+                started_at = now()
+                job.run()
+                job.refresh_from_db()
+
+                self.assertEqual(job.status, 'pending')
+                self.assertEqual(job.attempts, attempt)
+                self.assertIn('Геокодер недоступен', job.error)
+                self.assertGreaterEqual(job.run_after, started_at + timedelta(seconds=delay))
+                self.assertLessEqual(job.run_after, now() + timedelta(seconds=delay))
+                self.assertFalse(DeliveryJob.objects.ready().exists())
+
+            job.run()
+            job.refresh_from_db()
+
+        self.assertEqual(job.status, 'failed')
+        self.assertEqual(job.attempts, 3)
+
+    def test_successful_run_clears_error(self):
+        order = self.create_located_order()
+        job = DeliveryJob.enqueue(order)
+        job.attempts, job.error = 1, 'GeocoderError()'
+
+        job.run()
+        job.refresh_from_db()
+
+        self.assertEqual(job.status, 'done')
+        self.assertEqual(job.error, '')
+        self.assertEqual(order.deliveries.count(), 3)
+
+    def test_run_delivery_jobs_once(self):
+        ready_order = self.create_located_order()
+        postponed_order = self.create_located_order()
+        DeliveryJob.enqueue(ready_order)
+        DeliveryJob.enqueue(postponed_order)
+        DeliveryJob.objects.filter(order=postponed_order).update(run_after=now() + timedelta(minutes=1))
+        stdout = StringIO()
+
+        call_command('run_delivery_jobs', '--once', stdout=stdout)
+
+        self.assertEqual(stdout.getvalue().strip(), 'Processed 1 delivery jobs.')
+        self.assertEqual(DeliveryJob.objects.get(order=ready_order).status, 'done')
+        self.assertEqual(DeliveryJob.objects.get(order=postponed_order).status, 'pending')
+        self.assertEqual(ready_order.deliveries.count(), 3)
+        self.assertFalse(postponed_order.deliveries.exists())
+
+
+class DispatchTest(OrdersTestCase):
+    def test_dispatch(self):
+        first_order, second_order = self.create_orders(2)
+        assigned_order, = self.create_orders(1, preparing_restaurant=self.restaurants[2])
+        near_restaurant, far_restaurant, busy_restaurant = self.restaurants
+        Delivery.objects.filter(restaurant=busy_restaurant).update(can_fulfil=False)
+        Delivery.objects.filter(order=first_order, restaurant=far_restaurant).update(distance=1100)
+        Delivery.objects.filter(order=second_order, restaurant=near_restaurant).update(distance=1050)
+        Delivery.objects.filter(order=second_order, restaurant=far_restaurant).update(distance=5000)
+
+        greedy_plan = plan_dispatch(mode='greedy', load_weight=0, capacity=1)
+        optimal_plan = plan_dispatch(mode='optimal', load_weight=0, capacity=1)
+
+        self.assertEqual(greedy_plan.get_total_distance(), 6000)
+        self.assertEqual(optimal_plan.get_total_distance(), 2150)
+        self.assertEqual(optimal_plan.unassigned_orders_ids, [])
+
+        cursor = OrderChange.objects.get_cursor()
+        self.assertEqual(apply_dispatch(optimal_plan), 2)
+
+        restaurants = dict(Order.objects.values_list('id', 'preparing_restaurant'))
+        self.assertEqual(restaurants[first_order.id], far_restaurant.id)
+        self.assertEqual(restaurants[second_order.id], near_restaurant.id)
+        self.assertEqual(restaurants[assigned_order.id], busy_restaurant.id)
+        self.assertEqual(
+            set(OrderChange.objects.filter(id__gt=cursor).values_list('order_id', flat=True)),
+            {first_order.id, second_order.id},
+        )
+
+    def test_optimal_dispatch_scales_with_orders(self):
+        # Без ограничения вместимости у задачи о назначениях со слотами было бы 2000 x 100 000 клеток.
+        orders_count, restaurants_count = 2000, 50
+        rng = np.random.default_rng(0)
+        deliveries = [
+            (order_id, int(restaurant_id), int(rng.uniform(500, 15000)))
+            for order_id in range(orders_count)
+            for restaurant_id in rng.choice(restaurants_count, 10, replace=False)
+        ]
+        matrix = CostMatrix(range(orders_count), range(restaurants_count), deliveries, {}, load_weight=2)
+
+        started_at = time.perf_counter()
+        pairs = matrix.solve_optimal()
+
+        self.assertLess(time.perf_counter() - started_at, 30)
+        self.assertEqual(len(pairs), orders_count)
+        self.assertLessEqual(self.get_total_cost(matrix, pairs), self.get_total_cost(matrix, matrix.solve_greedy()))
+
+    @staticmethod
+    def get_total_cost(matrix: CostMatrix, pairs: list[tuple[int, int]]) -> float:
+        loads = np.bincount([column for row, column in pairs], minlength=len(matrix.restaurants_ids))
+
+        return sum(matrix.distances[row, column] / 1000 for row, column in pairs) + matrix.load_weight * sum(
+            load * (load - 1) / 2 for load in loads
+        )
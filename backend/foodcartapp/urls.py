@@ -1,6 +1,6 @@
 from django.urls import path
 
-from .views import product_list_api, banners_list_api, register_order
+from .views import product_list_api, banners_list_api, register_order, register_orders_batch
 
 
 app_name = "foodcartapp"
@@ -9,4 +9,5 @@ urlpatterns = [
     path('products/', product_list_api),
     path('banners/', banners_list_api),
     path('order/', register_order),
+    path('orders/batch/', register_orders_batch),
 ]
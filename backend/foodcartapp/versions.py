@@ -0,0 +1,33 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+
+def get_version(name: str) -> int:
+    """
+    Функция возвращает текущую версию данных name. Версии хранятся в БД, а не в кэше
+    процесса, поэтому смену версии в одном процессе видят все остальные.
+    Версия всегда читается из основной БД: по отставшей реплике кэш собрали бы по старым данным.
+    """
+    from .models import DataVersion
+
+    version = DataVersion.objects.using('default').filter(name=name).values_list('version', flat=True).first()
+
+    return version or 0
+
+
+def bump_version(name: str) -> int:
+    """
+    Функция увеличивает версию данных name на единицу и возвращает новую версию.
+    Если новая версия больше прежней ровно на единицу, другие процессы версию не меняли.
+    """
+    from .models import DataVersion
+
+    with transaction.atomic(using='default'):
+        if not DataVersion.objects.filter(name=name).update(version=F('version') + 1):
+            try:
+                with transaction.atomic(using='default'):
+                    DataVersion.objects.create(name=name, version=1)
+            except IntegrityError:
+                DataVersion.objects.filter(name=name).update(version=F('version') + 1)
+
+        return DataVersion.objects.get(name=name).version
@@ -1,16 +1,52 @@
+import asyncio
+import hashlib
+import json
+from functools import lru_cache
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import transaction
-from django.http import JsonResponse, HttpResponseBadRequest
+from django.http import HttpResponse, HttpResponseNotAllowed, JsonResponse
 from django.templatetags.static import static
-from rest_framework.decorators import api_view
+from django.utils.cache import get_conditional_response, patch_cache_control, quote_etag
+from django.utils.http import http_date
+from django.utils.timezone import now
+from django.views.decorators.http import condition
+from rest_framework.decorators import api_view, parser_classes
+from rest_framework.parsers import JSONParser
 from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
 
+from .geocoder import GeocoderError, geocode_async
 from .models import Product
-from .serializers import OrderSerializer
+from .parsers import NDJSONParser
+from .serializers import OrderSerializer, register_orders
+from .versions import get_version
 
 
-def banners_list_api(request):
+def dump_payload(data) -> dict:
+    content = json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False).encode()
+
+    return {
+        'content': content,
+        'etag': hashlib.md5(content).hexdigest(),
+        'last_modified': now(),
+    }
+
+
+def make_json_response(payload: dict) -> HttpResponse:
+    response = HttpResponse(payload['content'], content_type='application/json')
+    patch_cache_control(response, public=True, max_age=settings.CATALOG_CACHE_MAX_AGE)
+
+    return response
+
+
+@lru_cache(maxsize=None)
+def get_banners_payload() -> dict:
     # FIXME move data to db?
-    return JsonResponse([
+    return dump_payload([
         {
             'title': 'Burger',
             'src': static('burger.jpg'),
@@ -26,14 +62,22 @@ def banners_list_api(request):
             'src': static('tasty.jpg'),
             'text': 'Food is incomplete without a tasty dessert',
         }
-    ], safe=False, json_dumps_params={
-        'ensure_ascii': False,
-        'indent': 4,
-    })
+    ])
+
 
+def get_catalog_payload() -> dict:
+    """
+    Функция возвращает готовый JSON каталога из кэша Django. Ключ кэша содержит версию 'catalog' из БД,
+    которую меняют сигналы при правке продуктов, категорий и меню ресторанов и команды импорта,
+    поэтому после правки в любом процессе все воркеры собирают каталог заново.
+    """
+    key = f'catalog:{get_version("catalog")}'
 
-def product_list_api(request):
-    products = Product.objects.select_related('category').available()
+    if payload := cache.get(key):
+        return payload
+
+    # Каталог кэшируется до смены версии, поэтому собирается из основной БД, а не из отстающей реплики.
+    products = Product.objects.using('default').select_related('category').available()
 
     dumped_products = []
     for product in products:
@@ -54,17 +98,99 @@ def product_list_api(request):
             }
         }
         dumped_products.append(dumped_product)
-    return JsonResponse(dumped_products, safe=False, json_dumps_params={
-        'ensure_ascii': False,
-        'indent': 4,
-    })
+
+    payload = dump_payload(dumped_products)
+    cache.set(key, payload, timeout=None)
+
+    return payload
+
+
+@condition(
+    etag_func=lambda request: get_banners_payload()['etag'],
+    last_modified_func=lambda request: get_banners_payload()['last_modified'],
+)
+def banners_list_api(request):
+    return make_json_response(get_banners_payload())
+
+
+async def product_list_api(request):
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponseNotAllowed(['GET', 'HEAD'])
+
+    payload = await sync_to_async(get_catalog_payload)()
+    etag = quote_etag(payload['etag'])
+    last_modified = int(payload['last_modified'].timestamp())
+
+    # То же, что делает декоратор condition, который не умеет работать с асинхронными представлениями.
+    if not (response := get_conditional_response(request, etag=etag, last_modified=last_modified)):
+        response = make_json_response(payload)
+
+    response.headers.setdefault('ETag', etag)
+    response.headers.setdefault('Last-Modified', http_date(last_modified))
+
+    return response
+
+
+async def geocode_order_address(address: str) -> dict:
+    """
+    Функция определяет координаты адреса заказа, пока заказ оформляется. Если геокодер не ответил
+    за ORDER_GEOCODING_TIMEOUT секунд или сломался, координаты позже определит расчёт доставки.
+    """
+    try:
+        coordinates = await asyncio.wait_for(geocode_async(address), settings.ORDER_GEOCODING_TIMEOUT)
+    except (GeocoderError, asyncio.TimeoutError):
+        return {}
+
+    lon, lat = coordinates or (None, None)
+
+    return {
+        'lon': lon,
+        'lat': lat,
+        'geocoding_status': 'found' if coordinates else 'not found',
+        'geocoded_at': now(),
+    }
+
+
+def save_order(order_serializer: OrderSerializer, **fields) -> None:
+    with transaction.atomic(durable=True):
+        order_serializer.save(**fields)
+
+
+async def register_order(request) -> JsonResponse | HttpResponseNotAllowed:
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+
+    try:
+        order_notes = json.loads(request.body)
+    except ValueError as error:
+        return JsonResponse({'detail': f'JSON parse error - {error}'}, status=400)
+
+    order_serializer = OrderSerializer(data=order_notes)
+    if not await sync_to_async(order_serializer.is_valid)():
+        return JsonResponse(order_serializer.errors, status=400, encoder=JSONEncoder)
+
+    geocoding_fields = await geocode_order_address(order_serializer.validated_data['address'])
+    await sync_to_async(save_order)(order_serializer, **geocoding_fields)
+
+    return JsonResponse(order_serializer.data, encoder=JSONEncoder)
+
+
+# Как и представления DRF, API заказов не проверяет CSRF-токен. Декоратор csrf_exempt
+# в Django 3.2 не поддерживает асинхронные представления, поэтому флаг выставлен вручную.
+register_order.csrf_exempt = True
 
 
-@transaction.atomic(durable=True)
 @api_view(['POST'])
-def register_order(request) -> Response | HttpResponseBadRequest:
-    order_serializer = OrderSerializer(data=request.data)
-    order_serializer.is_valid(raise_exception=True)
-    order = order_serializer.create()
+@parser_classes([JSONParser, NDJSONParser])
+def register_orders_batch(request) -> Response:
+    """
+    Пачка заказов от партнёров: JSON-массив или NDJSON, по заказу в строке.
+    В ответе результат для каждого заказа в том же порядке.
+    """
+    if not isinstance(request.data, list):
+        return Response({'error': 'Ожидается список заказов'}, status=400)
+
+    if len(request.data) > settings.ORDERS_BATCH_MAX_SIZE:
+        return Response({'error': f'В пачке больше {settings.ORDERS_BATCH_MAX_SIZE} заказов'}, status=400)
 
-    return Response(OrderSerializer(order).data)
+    return Response(register_orders(request.data))
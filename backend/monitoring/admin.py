@@ -0,0 +1,67 @@
+from django.contrib import admin
+from django.http import FileResponse
+from django.shortcuts import get_object_or_404, reverse
+from django.urls import path
+from django.utils.html import format_html
+
+from .models import RequestProfile
+
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = [
+        'created_at',
+        'view',
+        'method',
+        'path',
+        'status_code',
+        'duration',
+        'samples',
+        'sampled',
+        'get_stacks_link',
+    ]
+    list_filter = [
+        'view',
+        'sampled',
+    ]
+    readonly_fields = [
+        'view',
+        'method',
+        'path',
+        'status_code',
+        'duration',
+        'samples',
+        'sampled',
+        'created_at',
+        'get_stacks_link',
+    ]
+    exclude = [
+        'stacks',
+    ]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        return [
+            path(
+                '<int:profile_id>/stacks/',
+                self.admin_site.admin_view(self.download_stacks),
+                name='monitoring_requestprofile_stacks',
+            ),
+        ] + super().get_urls()
+
+    def download_stacks(self, request, profile_id):
+        profile = get_object_or_404(RequestProfile, pk=profile_id)
+        return FileResponse(profile.stacks.open('rb'), as_attachment=True, filename=profile.stacks.name)
+
+    def get_stacks_link(self, obj):
+        return format_html(
+            '<a href="{}">{}</a>',
+            reverse('admin:monitoring_requestprofile_stacks', args=[obj.id]),
+            obj.stacks.name,
+        )
+    get_stacks_link.short_description = 'стеки для flame graph'
@@ -0,0 +1,78 @@
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+# То же, что делает воркер gunicorn при старте: настройка Django, WSGI-приложение и все URL.
+BOOT_SCRIPT = '''
+import django.urls
+import star_burger.asgi
+django.urls.get_resolver().url_patterns
+'''
+
+
+class Command(BaseCommand):
+    help = 'Measure worker boot import time with python -X importtime and show the slowest packages'
+
+    def handle(self, *args, **options):
+        runs = [self.measure_imports() for _ in range(options['repeat'])]
+
+        totals = [sum(packages.values()) for packages in runs]
+        self.stdout.write(f'Boot imports: median {statistics.median(totals) / 1000:.0f} ms '
+                          f'over {len(runs)} runs (min {min(totals) / 1000:.0f} ms)')
+
+        packages = defaultdict(list)
+        for run in runs:
+            for package, self_time in run.items():
+                packages[package].append(self_time)
+
+        slowest_packages = sorted(
+            packages.items(),
+            key=lambda package: statistics.median(package[1]),
+            reverse=True,
+        )[:options['top']]
+
+        for package, self_times in slowest_packages:
+            self.stdout.write(f'{statistics.median(self_times) / 1000:8.1f} ms  {package}')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+        )
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=15,
+            help='Number of the slowest top-level packages to show',
+        )
+
+    def measure_imports(self) -> dict[str, int]:
+        """
+        Функция запускает загрузку воркера в чистом интерпретаторе и возвращает
+        собственное время импорта каждого пакета верхнего уровня в микросекундах.
+        """
+        completed_process = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', BOOT_SCRIPT],
+            cwd=settings.BASE_DIR,
+            env={**os.environ, 'DJANGO_SETTINGS_MODULE': 'star_burger.settings'},
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+
+        packages = defaultdict(int)
+        for line in completed_process.stderr.splitlines():
+            if not line.startswith('import time:') or 'self [us]' in line:
+                continue
+
+            self_time, cumulative_time, module = line.removeprefix('import time:').split('|')
+            packages[module.strip().split('.')[0]] += int(self_time)
+
+        return packages
@@ -0,0 +1,205 @@
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from pathlib import Path
+
+from django.conf import settings
+
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+METRICS_HELP = {
+    'http_requests_total': ('counter', 'Обработанные запросы'),
+    'http_request_duration_seconds': ('histogram', 'Время обработки запроса'),
+    'db_queries_total': ('counter', 'Запросы к БД'),
+    'db_query_duration_seconds_total': ('counter', 'Суммарное время запросов к БД'),
+    'geocoder_requests_total': ('counter', 'Запросы к геокодеру'),
+    'geocoder_duration_seconds_total': ('counter', 'Суммарное время запросов к геокодеру'),
+    'geocoder_request_duration_seconds': ('histogram', 'Время ответа геокодера'),
+}
+
+
+class RequestStats:
+    """
+    Счётчики запросов к БД в рамках одного HTTP-запроса.
+    Представления различаются по имени URL, а без имени — по пути к функции.
+    """
+
+    def __init__(self, request):
+        self.request = request
+        self.db_queries = 0
+        self.db_time = 0.0
+
+    @property
+    def view(self) -> str:
+        if not (resolver_match := getattr(self.request, 'resolver_match', None)):
+            return 'unresolved'
+
+        return resolver_match.view_name or resolver_match._func_path
+
+
+current_request_stats = ContextVar('current_request_stats', default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Обёртка всех запросов к БД. Контекст запроса переходит и в потоки sync_to_async,
+    поэтому запросы асинхронных представлений тоже учитываются.
+    """
+    if not (stats := current_request_stats.get()):
+        return execute(sql, params, many, context)
+
+    started_at = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.db_queries += 1
+        stats.db_time += time.perf_counter() - started_at
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class MetricsRegistry:
+    """
+    Метрики процесса. Каждый воркер gunicorn не чаще раза в METRICS_FLUSH_INTERVAL секунд
+    сохраняет свои метрики в файл <pid>.json в каталоге METRICS_DIR, а страница метрик
+    суммирует файлы всех воркеров.
+    """
+
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+        self.flushed_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, labels: dict, value: float = 1) -> None:
+        key = (name, tuple(sorted(labels.items())))
+
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, labels: dict, value: float) -> None:
+        key = (name, tuple(sorted(labels.items())))
+
+        with self._lock:
+            buckets, total, count = self.histograms.get(key) or ([0] * (len(DURATION_BUCKETS) + 1), 0.0, 0)
+            buckets[bisect_left(DURATION_BUCKETS, value)] += 1
+            self.histograms[key] = (buckets, total + value, count + 1)
+
+    def dump(self) -> dict:
+        with self._lock:
+            return {
+                'counters': [
+                    [name, dict(labels), value]
+                    for (name, labels), value in self.counters.items()
+                ],
+                'histograms': [
+                    [name, dict(labels), list(buckets), total, count]
+                    for (name, labels), (buckets, total, count) in self.histograms.items()
+                ],
+            }
+
+    def flush(self, force: bool = False) -> None:
+        if not settings.METRICS_DIR:
+            return
+
+        if not force and time.monotonic() - self.flushed_at < settings.METRICS_FLUSH_INTERVAL:
+            return
+
+        self.flushed_at = time.monotonic()
+
+        metrics_dir = Path(settings.METRICS_DIR)
+        metrics_dir.mkdir(parents=True, exist_ok=True)
+        temp_path = metrics_dir / f'{os.getpid()}.json.tmp'
+        temp_path.write_text(json.dumps(self.dump()))
+        os.replace(temp_path, metrics_dir / f'{os.getpid()}.json')
+
+
+registry = MetricsRegistry()
+
+
+def collect_dumps() -> list[dict]:
+    if not settings.METRICS_DIR:
+        return [registry.dump()]
+
+    registry.flush(force=True)
+    dumps = []
+
+    for path in Path(settings.METRICS_DIR).glob('*.json'):
+        try:
+            dumps.append(json.loads(path.read_text()))
+        except (OSError, ValueError):
+            continue
+
+    return dumps
+
+
+def format_labels(labels: dict) -> str:
+    if not labels:
+        return ''
+
+    escaped_labels = (
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+        for name, value in sorted(labels.items())
+    )
+    return '{' + ','.join(escaped_labels) + '}'
+
+
+def render_metrics() -> str:
+    """
+    Функция суммирует метрики всех воркеров и возвращает их в текстовом формате Prometheus.
+    """
+    counters = {}
+    histograms = {}
+
+    for dump in collect_dumps():
+        for name, labels, value in dump['counters']:
+            key = (name, tuple(sorted(labels.items())))
+            counters[key] = counters.get(key, 0) + value
+
+        for name, labels, buckets, total, count in dump['histograms']:
+            key = (name, tuple(sorted(labels.items())))
+            summed_buckets, summed_total, summed_count = histograms.get(key) or ([0] * len(buckets), 0.0, 0)
+            histograms[key] = (
+                [summed + bucket for summed, bucket in zip(summed_buckets, buckets)],
+                summed_total + total,
+                summed_count + count,
+            )
+
+    lines = []
+    for metric_name, (metric_type, metric_help) in METRICS_HELP.items():
+        lines.append(f'# HELP {metric_name} {metric_help}')
+        lines.append(f'# TYPE {metric_name} {metric_type}')
+
+        for (name, labels), value in sorted(counters.items()):
+            if name == metric_name:
+                lines.append(f'{name}{format_labels(dict(labels))} {value}')
+
+        for (name, labels), (buckets, total, count) in sorted(histograms.items()):
+            if name != metric_name:
+                continue
+
+            cumulative = 0
+            for bound, bucket in zip((*DURATION_BUCKETS, '+Inf'), buckets):
+                cumulative += bucket
+                lines.append(f'{name}_bucket{format_labels({**dict(labels), "le": bound})} {cumulative}')
+
+            lines.append(f'{name}_sum{format_labels(dict(labels))} {total}')
+            lines.append(f'{name}_count{format_labels(dict(labels))} {count}')
+
+    return '\n'.join(lines) + '\n'
+
+
+def record_geocoder_request(outcome: str, duration: float) -> None:
+    stats = current_request_stats.get()
+    view = stats.view if stats else 'background'
+
+    registry.inc('geocoder_requests_total', {'view': view, 'outcome': outcome})
+    registry.inc('geocoder_duration_seconds_total', {'view': view}, duration)
+    registry.observe('geocoder_request_duration_seconds', {'outcome': outcome}, duration)
@@ -0,0 +1,180 @@
+import asyncio
+import random
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.utils.timezone import now
+
+from .metrics import RequestStats, current_request_stats, registry
+from .models import RequestProfile
+from .profiling import SamplingProfiler
+
+
+class AsyncCapableMiddleware:
+    """
+    Основа для промежуточных слоёв, которые работают и под WSGI, и под ASGI:
+    в асинхронной цепочке вызывается __acall__, чтобы не переключаться в поток.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+
+        return self.call(request)
+
+    def call(self, request):
+        raise NotImplementedError
+
+    async def __acall__(self, request):
+        raise NotImplementedError
+
+
+class MetricsMiddleware(AsyncCapableMiddleware):
+    """
+    Записывает время обработки, число и время запросов к БД для каждого представления.
+    """
+
+    def call(self, request):
+        stats = RequestStats(request)
+        token = current_request_stats.set(stats)
+        started_at = time.perf_counter()
+
+        try:
+            response = self.get_response(request)
+        finally:
+            current_request_stats.reset(token)
+
+        self.record(request, response, stats, time.perf_counter() - started_at)
+
+        return response
+
+    async def __acall__(self, request):
+        stats = RequestStats(request)
+        token = current_request_stats.set(stats)
+        started_at = time.perf_counter()
+
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_request_stats.reset(token)
+
+        self.record(request, response, stats, time.perf_counter() - started_at)
+
+        return response
+
+    def record(self, request, response, stats: RequestStats, duration: float) -> None:
+        labels = {'view': stats.view, 'method': request.method}
+
+        registry.inc('http_requests_total', {**labels, 'status': response.status_code})
+        registry.observe('http_request_duration_seconds', labels, duration)
+        registry.inc('db_queries_total', {'view': stats.view}, stats.db_queries)
+        registry.inc('db_query_duration_seconds_total', {'view': stats.view}, stats.db_time)
+        registry.flush()
+
+
+class ProfilingMiddleware(AsyncCapableMiddleware):
+    """
+    Профилирует запрос сэмплирующим профилировщиком, если сотрудник передал заголовок
+    X-Profile или параметр ?profile, а также случайную долю PROFILING_SAMPLE_RATE всех запросов.
+    Стеки сохраняются в PROFILING_DIR, а список профилей доступен в админке.
+    Под ASGI синхронные представления выполняются не в потоке цикла событий, а в потоке sync_to_async,
+    поэтому профилируемые потоки выбирает process_view.
+    """
+
+    def call(self, request):
+        requested = self.is_requested(request) and request.user.is_staff
+        sampled = not requested and random.random() < settings.PROFILING_SAMPLE_RATE
+
+        if not (requested or sampled):
+            return self.get_response(request)
+
+        profiler = request.profiler = SamplingProfiler(settings.PROFILING_INTERVAL)
+        started_at = time.perf_counter()
+        profiler.start()
+
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.stop()
+
+        self.save_profile(request, response, profiler, time.perf_counter() - started_at, sampled)
+
+        return response
+
+    async def __acall__(self, request):
+        requested = self.is_requested(request) and await sync_to_async(lambda: request.user.is_staff)()
+        sampled = not requested and random.random() < settings.PROFILING_SAMPLE_RATE
+
+        if not (requested or sampled):
+            return await self.get_response(request)
+
+        profiler = request.profiler = SamplingProfiler(settings.PROFILING_INTERVAL)
+        started_at = time.perf_counter()
+        profiler.start()
+
+        try:
+            response = await self.get_response(request)
+        finally:
+            profiler.stop()
+
+        await sync_to_async(self.save_profile)(
+            request,
+            response,
+            profiler,
+            time.perf_counter() - started_at,
+            sampled,
+        )
+
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        """
+        Синхронный метод: под ASGI Django вызывает его в том же потоке sync_to_async, что и
+        синхронное представление. Синхронное представление профилируется в этом потоке,
+        асинхронное — ещё и в потоке цикла событий, где его код выполняется между await.
+        """
+        if not (profiler := getattr(request, 'profiler', None)):
+            return None
+
+        if asyncio.iscoroutinefunction(view_func):
+            profiler.set_threads(profiler.threads_ids | {threading.get_ident()})
+        else:
+            profiler.set_threads([threading.get_ident()])
+
+        return None
+
+    @staticmethod
+    def is_requested(request) -> bool:
+        return 'HTTP_X_PROFILE' in request.META or 'profile' in request.GET
+
+    @staticmethod
+    def save_profile(request, response, profiler: SamplingProfiler, duration: float, sampled: bool) -> None:
+        if request.resolver_match:
+            view = request.resolver_match.view_name or request.resolver_match._func_path
+        else:
+            view = 'unresolved'
+
+        request_profile = RequestProfile(
+            view=view,
+            method=request.method,
+            path=request.get_full_path()[:500],
+            status_code=response.status_code,
+            duration=duration,
+            samples=profiler.samples,
+            sampled=sampled,
+        )
+        request_profile.stacks.save(
+            f'{now():%Y%m%d-%H%M%S}-{view.replace(":", "-")}-{duration * 1000:.0f}ms.folded',
+            ContentFile(profiler.get_collapsed_stacks().encode()),
+        )
@@ -0,0 +1,36 @@
+# Generated by Django 3.2.15 on 2026-10-18 18:23
+
+from django.db import migrations, models
+import django.utils.timezone
+import monitoring.models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestProfile',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('view', models.CharField(db_index=True, max_length=200, verbose_name='представление')),
+                ('method', models.CharField(max_length=10, verbose_name='метод')),
+                ('path', models.CharField(max_length=500, verbose_name='адрес')),
+                ('status_code', models.PositiveSmallIntegerField(verbose_name='код ответа')),
+                ('duration', models.FloatField(verbose_name='время обработки (с)')),
+                ('samples', models.PositiveIntegerField(verbose_name='снято стеков')),
+                ('stacks', models.FileField(storage=monitoring.models.get_profiles_storage, upload_to='', verbose_name='стеки')),
+                ('sampled', models.BooleanField(default=False, verbose_name='выбран случайно')),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='снят')),
+            ],
+            options={
+                'verbose_name': 'профиль запроса',
+                'verbose_name_plural': 'профили запросов',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
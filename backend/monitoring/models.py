@@ -0,0 +1,54 @@
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import models
+from django.utils.timezone import now
+
+
+def get_profiles_storage():
+    return FileSystemStorage(location=settings.PROFILING_DIR)
+
+
+class RequestProfile(models.Model):
+    view = models.CharField(
+        'представление',
+        max_length=200,
+        db_index=True,
+    )
+    method = models.CharField(
+        'метод',
+        max_length=10,
+    )
+    path = models.CharField(
+        'адрес',
+        max_length=500,
+    )
+    status_code = models.PositiveSmallIntegerField(
+        'код ответа',
+    )
+    duration = models.FloatField(
+        'время обработки (с)',
+    )
+    samples = models.PositiveIntegerField(
+        'снято стеков',
+    )
+    stacks = models.FileField(
+        'стеки',
+        storage=get_profiles_storage,
+    )
+    sampled = models.BooleanField(
+        'выбран случайно',
+        default=False,
+    )
+    created_at = models.DateTimeField(
+        'снят',
+        default=now,
+        db_index=True,
+    )
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'профиль запроса'
+        verbose_name_plural = 'профили запросов'
+
+    def __str__(self):
+        return f'{self.method} {self.path} {self.duration:.3f} с'
@@ -0,0 +1,53 @@
+import sys
+import threading
+from collections import Counter
+
+
+class SamplingProfiler:
+    """
+    Сэмплирующий профилировщик: отдельный поток каждые interval секунд снимает стеки
+    профилируемых потоков. Сначала это поток, запустивший профилировщик, а set_threads
+    заменяет их, например, на поток, в котором на самом деле выполняется представление.
+    Результат — стеки в формате collapsed stacks, его открывают speedscope.app и flamegraph.pl.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self.threads_ids = frozenset()
+        self._stopped = threading.Event()
+        self._sampler = None
+
+    def start(self) -> None:
+        self.threads_ids = frozenset([threading.get_ident()])
+        self._sampler = threading.Thread(target=self._sample, daemon=True)
+        self._sampler.start()
+
+    def set_threads(self, threads_ids) -> None:
+        self.threads_ids = frozenset(threads_ids)
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._sampler.join()
+
+    def _sample(self) -> None:
+        while not self._stopped.wait(self.interval):
+            frames = sys._current_frames()
+
+            for thread_id in self.threads_ids:
+                if (frame := frames.get(thread_id)) is None:
+                    continue
+
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f'{code.co_name} ({code.co_filename}:{code.co_firstlineno})')
+                    frame = frame.f_back
+
+                self.stacks[';'.join(reversed(stack))] += 1
+                self.samples += 1
+
+    def get_collapsed_stacks(self) -> str:
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
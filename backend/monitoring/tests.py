@@ -0,0 +1,115 @@
+import json
+import os
+import time
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.files.storage import FileSystemStorage
+from django.http import HttpResponse
+from django.test import AsyncClient, TestCase, override_settings
+from django.urls import path, reverse
+
+from .metrics import MetricsRegistry, render_metrics
+from .models import RequestProfile
+
+
+def slow_view(request):
+    time.sleep(0.1)
+
+    return HttpResponse('ok')
+
+
+urlpatterns = [
+    path('slow/', slow_view),
+]
+
+
+@override_settings(ROOT_URLCONF='monitoring.tests', PROFILING_INTERVAL=0.002)
+class ProfilingMiddlewareTest(TestCase):
+    def setUp(self):
+        profiles_dir = TemporaryDirectory()
+        self.addCleanup(profiles_dir.cleanup)
+
+        stacks_field = RequestProfile._meta.get_field('stacks')
+        self.addCleanup(setattr, stacks_field, 'storage', stacks_field.storage)
+        stacks_field.storage = FileSystemStorage(location=profiles_dir.name)
+
+        self.manager = User.objects.create_user(username='manager', password='manager', is_staff=True)
+
+    def assert_view_profiled(self):
+        request_profile = RequestProfile.objects.get()
+        stacks = request_profile.stacks.read().decode()
+
+        view_samples = sum(
+            int(line.rsplit(' ', 1)[1])
+            for line in stacks.splitlines()
+            if 'slow_view' in line
+        )
+        # До вызова представления профилировщик успевает снять пару стеков промежуточных слоёв.
+        self.assertGreater(view_samples, request_profile.samples * 0.8, stacks)
+
+    def test_sync_view_under_wsgi(self):
+        self.client.force_login(self.manager)
+        self.client.get('/slow/?profile')
+
+        self.assert_view_profiled()
+
+    async def test_sync_view_under_asgi(self):
+        client = AsyncClient()
+        await sync_to_async(client.force_login)(self.manager)
+        await client.get('/slow/?profile')
+
+        await sync_to_async(self.assert_view_profiled)()
+
+
+class MetricsTest(TestCase):
+    def setUp(self):
+        metrics_dir = TemporaryDirectory()
+        self.addCleanup(metrics_dir.cleanup)
+        self.metrics_dir = Path(metrics_dir.name)
+
+        metrics_settings = override_settings(METRICS_DIR=metrics_dir.name)
+        metrics_settings.enable()
+        self.addCleanup(metrics_settings.disable)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_token(self):
+        url = reverse('monitoring:metrics')
+
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+        self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer secret').status_code, 200)
+
+    @override_settings(METRICS_TOKEN='')
+    def test_staff_only_without_token(self):
+        url = reverse('monitoring:metrics')
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        self.client.force_login(User.objects.create_user(username='customer', password='customer'))
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        self.client.force_login(User.objects.create_user(username='manager', password='manager', is_staff=True))
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_workers_metrics_are_summed(self):
+        other_worker = MetricsRegistry()
+        other_worker.inc('db_queries_total', {'view': 'start_page'}, 2)
+        other_worker.observe('http_request_duration_seconds', {'view': 'start_page'}, 0.02)
+        (self.metrics_dir / '1.json').write_text(json.dumps(other_worker.dump()))
+        (self.metrics_dir / '2.json').write_text('{"counters": ')
+
+        current_worker = MetricsRegistry()
+        current_worker.inc('db_queries_total', {'view': 'start_page'}, 3)
+        current_worker.observe('http_request_duration_seconds', {'view': 'start_page'}, 3)
+
+        with patch('monitoring.metrics.registry', current_worker):
+            metrics = render_metrics().splitlines()
+
+        self.assertTrue((self.metrics_dir / f'{os.getpid()}.json').exists())
+        self.assertIn('db_queries_total{view="start_page"} 5', metrics)
+        self.assertIn('http_request_duration_seconds_bucket{le="0.025",view="start_page"} 1', metrics)
+        self.assertIn('http_request_duration_seconds_bucket{le="+Inf",view="start_page"} 2', metrics)
+        self.assertIn('http_request_duration_seconds_count{view="start_page"} 2', metrics)
@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+
+from .metrics import render_metrics
+
+
+def metrics_view(request):
+    if settings.METRICS_TOKEN:
+        authorization = request.headers.get('Authorization', '')
+        allowed = constant_time_compare(authorization, f'Bearer {settings.METRICS_TOKEN}')
+    else:
+        # Без токена метрики видят только сотрудники, вошедшие на сайт.
+        allowed = request.user.is_staff
+
+    if not allowed:
+        return HttpResponseForbidden()
+
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
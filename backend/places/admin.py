@@ -0,0 +1,19 @@
+from django.contrib import admin
+
+from .models import Place
+
+
+@admin.register(Place)
+class PlaceAdmin(admin.ModelAdmin):
+    search_fields = [
+        'address',
+    ]
+    list_display = [
+        'address',
+        'lat',
+        'lon',
+        'requested_at',
+    ]
+    readonly_fields = [
+        'requested_at',
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 3.2.15 on 2026-10-18 18:07
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Place',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('address', models.CharField(max_length=200, unique=True, verbose_name='адрес')),
+                ('lat', models.DecimalField(blank=True, decimal_places=6, max_digits=8, null=True, verbose_name='широта')),
+                ('lon', models.DecimalField(blank=True, decimal_places=6, max_digits=8, null=True, verbose_name='долгота')),
+                ('requested_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='дата запроса к геокодеру')),
+            ],
+            options={
+                'verbose_name': 'место',
+                'verbose_name_plural': 'места',
+            },
+        ),
+    ]
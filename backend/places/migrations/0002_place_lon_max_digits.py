@@ -0,0 +1,18 @@
+# Generated by Django 3.2.15 on 2026-10-18 19:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('places', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='place',
+            name='lon',
+            field=models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True, verbose_name='долгота'),
+        ),
+    ]
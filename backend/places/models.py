@@ -0,0 +1,46 @@
+from django.db import models
+from django.utils.timezone import now
+
+
+class Place(models.Model):
+    """
+    Кэш геокодера: нормализованный адрес и найденные для него координаты.
+    Если геокодер не нашёл адрес, то координаты остаются пустыми (негативный кэш).
+    """
+    address = models.CharField(
+        'адрес',
+        max_length=200,
+        unique=True,
+    )
+    lat = models.DecimalField(
+        verbose_name='широта',
+        decimal_places=6,
+        max_digits=8,
+        null=True,
+        blank=True,
+    )
+    lon = models.DecimalField(
+        verbose_name='долгота',
+        decimal_places=6,
+        max_digits=9,
+        null=True,
+        blank=True,
+    )
+    requested_at = models.DateTimeField(
+        verbose_name='дата запроса к геокодеру',
+        default=now,
+        db_index=True,
+    )
+
+    class Meta:
+        verbose_name = 'место'
+        verbose_name_plural = 'места'
+
+    def __str__(self):
+        return self.address
+
+    def get_coordinates(self) -> tuple[float, float] | None:
+        if self.lon is None or self.lat is None:
+            return None
+
+        return float(self.lon), float(self.lat)
@@ -0,0 +1,12 @@
+from decimal import Decimal
+
+from django.test import TestCase
+
+from .models import Place
+
+
+class PlaceTest(TestCase):
+    def test_coordinates_east_of_100th_meridian(self):
+        Place.objects.create(address='владивосток', lon=Decimal('131.885485'), lat=Decimal('43.115542'))
+
+        self.assertEqual(Place.objects.get().get_coordinates(), (131.885485, 43.115542))
@@ -1,3 +1,164 @@
-from django.test import TestCase
+from datetime import timedelta
+from io import StringIO
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils.timezone import now
+
+from foodcartapp.models import ArchivedOrder, Delivery, DeliveryJob, Order, OrderChange
+from foodcartapp.testing import create_menu, create_orders
+
+
+class ViewOrdersTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user(username='manager', password='manager', is_staff=True)
+        cls.restaurants, (cls.product,) = create_menu()
+
+    def setUp(self):
+        self.client.force_login(self.manager)
+
+    def create_orders(self, count, **fields):
+        return create_orders(count, self.product, self.restaurants, **fields)
+
+    def test_query_count_does_not_depend_on_page_size(self):
+        # Сессия, пользователь, курсор журнала изменений, заказы, варианты доставки и рестораны для фильтра.
+        self.create_orders(2)
+
+        with override_settings(MANAGER_ORDERS_PAGE_SIZE=2):
+            with self.assertNumQueries(6):
+                response = self.client.get(reverse('restaurateur:view_orders'))
+
+        self.assertEqual(len(response.context['orders']), 2)
+
+        self.create_orders(20)
+
+        with override_settings(MANAGER_ORDERS_PAGE_SIZE=20):
+            with self.assertNumQueries(6):
+                response = self.client.get(reverse('restaurateur:view_orders'))
+
+        self.assertEqual(len(response.context['orders']), 20)
+        self.assertEqual(len(response.context['orders'][0].verified_deliveries), 3)
+
+    @override_settings(MANAGER_ORDERS_PAGE_SIZE=3)
+    def test_keyset_pagination(self):
+        orders = self.create_orders(4) + self.create_orders(2, status='2 cooking')
+
+        response = self.client.get(reverse('restaurateur:view_orders'))
+        self.assertEqual([order.id for order in response.context['orders']], [order.id for order in orders[:3]])
+        self.assertIsNotNone(response.context['next_page_query'])
+
+        response = self.client.get(f"{reverse('restaurateur:view_orders')}?{response.context['next_page_query']}")
+        self.assertEqual([order.id for order in response.context['orders']], [order.id for order in orders[3:]])
+        self.assertIsNone(response.context['next_page_query'])
+
+    def test_filters(self):
+        cash_order, = self.create_orders(1, payment='cash')
+        self.create_orders(1, payment='card')
+        assigned_order, = self.create_orders(1, payment='cash', preparing_restaurant=self.restaurants[0])
+        Delivery.objects.filter(order=cash_order, restaurant=self.restaurants[1]).update(can_fulfil=False)
+
+        response = self.client.get(reverse('restaurateur:view_orders'), {'payment': 'cash'})
+        self.assertEqual([order.id for order in response.context['orders']], [cash_order.id])
+
+        response = self.client.get(reverse('restaurateur:view_orders'), {'restaurant': self.restaurants[1].id})
+        self.assertNotIn(cash_order.id, [order.id for order in response.context['orders']])
+        self.assertNotIn(assigned_order.id, [order.id for order in response.context['orders']])
+
+    def test_deliveries_calculating(self):
+        order, = self.create_orders(1)
+        DeliveryJob.enqueue(order)
+
+        response = self.client.get(reverse('restaurateur:view_orders'))
+        self.assertContains(response, 'Рассчитываем расстояние до ресторанов')
+
+        DeliveryJob.objects.filter(order=order).update(status='done')
+
+        response = self.client.get(reverse('restaurateur:view_orders'))
+        self.assertNotContains(response, 'Рассчитываем расстояние до ресторанов')
+        self.assertContains(response, 'Может приготовить')
+
+    def test_archived_orders(self):
+        delivered_order, = self.create_orders(1, status='4 delivered')
+        self.create_orders(1)
+        ArchivedOrder.objects.archive(Order.objects.filter(status='4 delivered'))
+
+        response = self.client.get(reverse('restaurateur:view_archived_orders'))
+        self.assertEqual([order.id for order in response.context['orders']], [delivered_order.id])
+
+    @override_settings(ORDER_CHANGES_SETTLE_SECONDS=0)
+    def test_order_changes(self):
+        changed_order, unchanged_order = self.create_orders(2)
+        response = self.client.get(reverse('restaurateur:view_orders'))
+        cursor = response.context['changes_cursor']
+
+        changed_order.comment = 'Позвонить заранее'
+        changed_order.save()
+        new_order, = self.create_orders(1)
+        unchanged_order.status = '4 delivered'
+        unchanged_order.save()
+
+        response = self.client.get(reverse('restaurateur:view_order_changes'), {'since': cursor})
+        changes = response.json()
+
+        self.assertEqual(set(changes['rows']), {str(changed_order.id), str(new_order.id), str(unchanged_order.id)})
+        self.assertIn('Позвонить заранее', changes['rows'][str(changed_order.id)])
+        self.assertIsNone(changes['rows'][str(unchanged_order.id)])
+
+        response = self.client.get(reverse('restaurateur:view_order_changes'), {'since': changes['cursor']})
+        self.assertEqual(response.json(), {'cursor': changes['cursor'], 'rows': {}})
+
+    def test_order_changes_cursor_skips_fresh_changes(self):
+        settled_order, fresh_order = self.create_orders(2)
+        OrderChange.objects.filter(order_id=settled_order.id).update(changed_at=now() - timedelta(days=2))
+        settled_cursor = OrderChange.objects.filter(order_id=settled_order.id).latest('id').id
+
+        response = self.client.get(reverse('restaurateur:view_orders'))
+        self.assertEqual(response.context['changes_cursor'], settled_cursor)
+
+        call_command('prune_order_changes', stdout=StringIO())
+        self.assertEqual(OrderChange.objects.filter(id__lte=settled_cursor).get().id, settled_cursor)
+
+        response = self.client.get(reverse('restaurateur:view_order_changes'), {'since': settled_cursor})
+        self.assertEqual(set(response.json()['rows']), {str(fresh_order.id)})
+
+    @override_settings(MANAGER_ORDERS_PAGE_SIZE=2, ORDER_CHANGES_SETTLE_SECONDS=0)
+    def test_order_changes_stay_within_page(self):
+        first_order, second_order = self.create_orders(2)
+        third_order, = self.create_orders(1, status='2 cooking')
+
+        first_page = self.client.get(reverse('restaurateur:view_orders'))
+        second_page = self.client.get(reverse('restaurateur:view_orders'), {'after': f'1 not processed:{second_order.id}'})
+        self.assertIn('until=', first_page.context['changes_query'])
+        self.assertNotIn('until=', second_page.context['changes_query'])
+
+        for order in [first_order, third_order]:
+            order.comment = 'Позвонить заранее'
+            order.save()
+        # Новый заказ встаёт в конец необработанных, то есть на вторую страницу.
+        new_order, = self.create_orders(1)
+        # Заказ уходит с первой страницы на вторую вместе со сменой статуса.
+        second_order.status = '2 cooking'
+        second_order.save()
+
+        changes = {}
+        for name, page in [('first', first_page), ('second', second_page)]:
+            url = reverse('restaurateur:view_order_changes')
+            query = f'{page.context["changes_query"]}&since={page.context["changes_cursor"]}'
+            rows = self.client.get(f'{url}?{query}').json()['rows']
+            changes[name] = {int(order_id): row is not None for order_id, row in rows.items()}
+
+        self.assertEqual(changes['first'], {
+            first_order.id: True,
+            second_order.id: False,
+            third_order.id: False,
+            new_order.id: False,
+        })
+        self.assertEqual(changes['second'], {
+            first_order.id: False,
+            second_order.id: True,
+            third_order.id: True,
+            new_order.id: True,
+        })
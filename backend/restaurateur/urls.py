@@ -15,6 +15,10 @@ urlpatterns = [
     # TODO заглушка для нереализованного функционала
     path('orders/', views.view_orders, name="view_orders"),
 
+    path('orders/changes/', views.view_order_changes, name="view_order_changes"),
+
+    path('orders/archive/', views.view_archived_orders, name="view_archived_orders"),
+
     path('login/', views.LoginView.as_view(), name="login"),
     path('logout/', views.LogoutView.as_view(), name="logout"),
 ]
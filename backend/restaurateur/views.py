@@ -1,12 +1,21 @@
+from datetime import timedelta
+
 from django import forms
+from django.conf import settings
 from django.contrib.auth import authenticate, login
 from django.contrib.auth import views as auth_views
 from django.contrib.auth.decorators import user_passes_test
+from django.db.models import Prefetch, Q
+from django.http import JsonResponse
 from django.shortcuts import redirect, render
+from django.template.loader import render_to_string
 from django.views import View
 from django.urls import reverse_lazy
+from django.utils.timezone import now
 
-from foodcartapp.models import Order, Product, Restaurant
+from foodcartapp.availability import get_availability_index
+from foodcartapp.models import ArchivedOrder, Delivery, Order, OrderChange, Product, Restaurant
+from star_burger.db_router import use_replica
 
 
 class Login(forms.Form):
@@ -26,10 +35,54 @@ class Login(forms.Form):
     )
 
 
+class OrdersFilter(forms.Form):
+    status = forms.ChoiceField(
+        label='Статус', required=False,
+        choices=[('', 'Все')] + [choice for choice in Order.STATUS_CHOICES if choice[0] != '4 delivered'],
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    payment = forms.ChoiceField(
+        label='Оплата', required=False,
+        choices=[('', 'Все')] + Order.PAYMENT_CHOICES,
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    restaurant = forms.ModelChoiceField(
+        label='Может приготовить', required=False,
+        queryset=Restaurant.objects.order_by('name'),
+        empty_label='Все',
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    after = forms.CharField(
+        required=False,
+        widget=forms.HiddenInput()
+    )
+    until = forms.CharField(
+        required=False,
+        widget=forms.HiddenInput()
+    )
+
+    @staticmethod
+    def parse_cursor(cursor: str) -> tuple[str, int] | None:
+        if not cursor:
+            return None
+
+        status, separator, order_id = cursor.rpartition(':')
+        if not separator or not order_id.isdigit():
+            raise forms.ValidationError('Неверный курсор страницы')
+
+        return status, int(order_id)
+
+    def clean_after(self):
+        return self.parse_cursor(self.cleaned_data['after'])
+
+    def clean_until(self):
+        return self.parse_cursor(self.cleaned_data['until'])
+
+
 class LoginView(View):
     def get(self, request, *args, **kwargs):
         form = Login()
-        return render(request, "templates/login.html", context={
+        return render(request, "login.html", context={
             'form': form
         })
 
@@ -47,7 +100,7 @@ class LoginView(View):
                     return redirect("restaurateur:RestaurantView")
                 return redirect("start_page")
 
-        return render(request, "templates/login.html", context={
+        return render(request, "login.html", context={
             'form': form,
             'ivalid': True,
         })
@@ -62,36 +115,183 @@ def is_manager(user):
 
 
 @user_passes_test(is_manager, login_url='restaurateur:login')
+@use_replica
 def view_products(request):
     restaurants = list(Restaurant.objects.order_by('name'))
-    products = list(Product.objects.prefetch_related('menu_items'))
-
-    products_with_restaurant_availability = []
-    for product in products:
-        availability = {item.restaurant_id: item.availability for item in product.menu_items.all()}
-        ordered_availability = [availability.get(restaurant.id, False) for restaurant in restaurants]
+    products = list(Product.objects.select_related('category'))
+    availability_index = get_availability_index()
+    restaurants_ids = [restaurant.id for restaurant in restaurants]
 
-        products_with_restaurant_availability.append(
-            (product, ordered_availability)
-        )
+    products_with_restaurant_availability = [
+        (product, availability_index.get_availability(product.id, restaurants_ids))
+        for product in products
+    ]
 
-    return render(request, template_name="templates/products_list.html", context={
+    return render(request, template_name="products_list.html", context={
         'products_with_restaurant_availability': products_with_restaurant_availability,
         'restaurants': restaurants,
     })
 
 
 @user_passes_test(is_manager, login_url='restaurateur:login')
+@use_replica
 def view_restaurants(request):
-    return render(request, template_name="templates/restaurants_list.html", context={
+    return render(request, template_name="restaurants_list.html", context={
         'restaurants': Restaurant.objects.all(),
     })
 
 
 @user_passes_test(is_manager, login_url='restaurateur:login')
 def view_orders(request):
+    """
+    Страница необработанных заказов. Заказы листаются курсором по (status, id),
+    поэтому число запросов к БД не зависит ни от размера страницы, ни от её номера.
+    """
+    filters = OrdersFilter(request.GET)
+    filters.is_valid()
+    # Курсор журнала изменений берётся до выборки заказов, чтобы не пропустить изменения между ними.
+    # Как и в view_order_changes, он не заходит за свежие записи: запись с меньшим id может
+    # появиться позже, и страница её бы пропустила.
+    settled_at = now() - timedelta(seconds=settings.ORDER_CHANGES_SETTLE_SECONDS)
+    changes_cursor = OrderChange.objects.get_settled_cursor(settled_at)
+    orders = get_page_orders(get_filtered_orders(filters), after=filters.cleaned_data.get('after'))
+
+    page_size = settings.MANAGER_ORDERS_PAGE_SIZE
+    orders = list(orders[:page_size + 1])
+
+    # Изменения запрашиваются только для заказов страницы: от её курсора до её последнего заказа.
+    changes_query = request.GET.copy()
+    changes_query.pop('until', None)
+    next_page_query = None
+    if len(orders) > page_size:
+        orders = orders[:page_size]
+        next_page_query = request.GET.copy()
+        next_page_query['after'] = changes_query['until'] = f'{orders[-1].status}:{orders[-1].id}'
+        next_page_query = next_page_query.urlencode()
+
+    return render(
+        request,
+        template_name='order_items.html',
+        context={
+            'orders': orders,
+            'filters': filters,
+            'next_page_query': next_page_query,
+            'changes_cursor': changes_cursor,
+            'changes_query': changes_query.urlencode(),
+            'page_size': page_size,
+            'changes_poll_interval': settings.ORDER_CHANGES_POLL_INTERVAL,
+        },
+    )
+
+
+def get_page_orders(orders, after: tuple[str, int] = None, until: tuple[str, int] = None):
+    """
+    Функция оставляет заказы страницы: после курсора after и не дальше заказа until по (status, id).
+    """
+    if after:
+        status, order_id = after
+        orders = orders.filter(Q(status__gt=status) | Q(status=status, id__gt=order_id))
+
+    if until:
+        status, order_id = until
+        orders = orders.filter(Q(status__lt=status) | Q(status=status, id__lte=order_id))
+
+    return orders
+
+
+def get_filtered_orders(filters: OrdersFilter):
+    orders = Order.objects.get_not_delivered().select_related(
+        'preparing_restaurant',
+        'delivery_job',
+    ).prefetch_related(
+        Prefetch(
+            'deliveries',
+            queryset=Delivery.objects.filter(can_fulfil=True).select_related('restaurant'),
+            to_attr='verified_deliveries',
+        ),
+    )
+
+    if status := filters.cleaned_data.get('status'):
+        orders = orders.filter(status=status)
+
+    if payment := filters.cleaned_data.get('payment'):
+        orders = orders.filter(payment=payment)
+
+    if restaurant := filters.cleaned_data.get('restaurant'):
+        orders = orders.filter(deliveries__restaurant=restaurant, deliveries__can_fulfil=True)
+
+    return orders
+
+
+@user_passes_test(is_manager, login_url='restaurateur:login')
+def view_order_changes(request):
+    """
+    Изменения заказов после записи журнала since: для каждого изменённого заказа — новая
+    строка таблицы или null, если заказ больше не подходит под фильтры страницы или ушёл
+    за её границы after и until.
+    Свежие записи журнала отдаются повторно, пока не станут старше ORDER_CHANGES_SETTLE_SECONDS:
+    транзакции фиксируются не в порядке id, и запись с меньшим id может появиться позже.
+    """
+    filters = OrdersFilter(request.GET)
+    filters.is_valid()
+    since = int(request.GET['since']) if request.GET.get('since', '').isdigit() else 0
+
+    # Запись since удалила команда prune_order_changes: часть изменений потеряна, страницу надо перезагрузить.
+    if since and not OrderChange.objects.filter(id=since).exists():
+        return JsonResponse({'cursor': since, 'reload': True})
+
+    changes = list(OrderChange.objects.filter(id__gt=since).order_by('id')[:settings.ORDER_CHANGES_LIMIT])
+    if not changes:
+        return JsonResponse({'cursor': since, 'rows': {}})
+
+    settled_at = now() - timedelta(seconds=settings.ORDER_CHANGES_SETTLE_SECONDS)
+    cursor = since
+    for change in changes:
+        if change.changed_at > settled_at:
+            break
+        cursor = change.id
+
+    if len(changes) == settings.ORDER_CHANGES_LIMIT:
+        cursor = changes[-1].id
+
+    orders_ids = {change.order_id for change in changes}
+    rows = dict.fromkeys(orders_ids)
+    page_orders = get_page_orders(
+        get_filtered_orders(filters),
+        after=filters.cleaned_data.get('after'),
+        until=filters.cleaned_data.get('until'),
+    )
+    for order in page_orders.filter(id__in=orders_ids):
+        rows[order.id] = render_to_string('order_row.html', {'order': order}, request=request)
+
+    return JsonResponse({'cursor': cursor, 'rows': rows})
+
+
+@user_passes_test(is_manager, login_url='restaurateur:login')
+@use_replica
+def view_archived_orders(request):
+    """
+    Страница архива доставленных заказов. Заказы листаются курсором по id от новых к старым.
+    """
+    orders = ArchivedOrder.objects.select_related('preparing_restaurant').order_by('-id')
+
+    after = request.GET.get('after', '')
+    if after.isdigit():
+        orders = orders.filter(id__lt=int(after))
+
+    page_size = settings.MANAGER_ORDERS_PAGE_SIZE
+    orders = list(orders[:page_size + 1])
+
+    next_page_query = None
+    if len(orders) > page_size:
+        orders = orders[:page_size]
+        next_page_query = f'after={orders[-1].id}'
+
     return render(
         request,
-        template_name='templates/order_items.html',
-        context={'orders': Order.objects.get_not_delivered()},
+        template_name='archived_orders.html',
+        context={
+            'orders': orders,
+            'next_page_query': next_page_query,
+        },
     )
@@ -0,0 +1,123 @@
+import asyncio
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+
+replica_reads_enabled = ContextVar('replica_reads_enabled', default=False)
+
+
+@contextmanager
+def replica_reads():
+    token = replica_reads_enabled.set(True)
+    try:
+        yield
+    finally:
+        replica_reads_enabled.reset(token)
+
+
+def use_replica(view):
+    """
+    Декоратор для представлений, которые только читают данные: их запросы уходят на реплики.
+    """
+    if asyncio.iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(*args, **kwargs):
+            with replica_reads():
+                return await view(*args, **kwargs)
+
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        with replica_reads():
+            return view(*args, **kwargs)
+
+    return wrapper
+
+
+class ReplicaLagGuard:
+    """
+    Проверяет отставание реплик PostgreSQL не чаще раза в check_interval секунд.
+    Реплика, отставшая больше чем на max_lag секунд или недоступная, временно не используется.
+    """
+
+    def __init__(self):
+        self._checks = {}
+        self._lock = threading.Lock()
+
+    def is_fresh(self, alias: str) -> bool:
+        with self._lock:
+            checked_at, fresh = self._checks.get(alias, (None, None))
+
+        if checked_at is not None and time.monotonic() - checked_at < settings.DB_REPLICA_LAG_CHECK_INTERVAL:
+            return fresh
+
+        fresh = self.get_lag(alias) <= settings.DB_REPLICA_MAX_LAG
+
+        with self._lock:
+            self._checks[alias] = (time.monotonic(), fresh)
+
+        return fresh
+
+    def get_lag(self, alias: str) -> float:
+        """
+        Функция возвращает отставание реплики в секундах. Время последней применённой транзакции
+        не меняется, пока в основную БД ничего не пишут, поэтому реплика, применившая всё
+        полученное от основной БД, считается не отстающей.
+        """
+        connection = connections[alias]
+
+        if connection.vendor != 'postgresql':
+            return 0
+
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 '
+                    'ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END'
+                )
+                lag, = cursor.fetchone()
+        except DatabaseError:
+            return float('inf')
+
+        return float(lag)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._checks.clear()
+
+
+lag_guard = ReplicaLagGuard()
+
+
+class ReplicaRouter:
+    """
+    Запросы на чтение из представлений, помеченных use_replica, уходят на случайную свежую реплику.
+    Запись, чтение внутри транзакций и все остальные запросы идут в основную БД.
+    """
+
+    def db_for_read(self, model, **hints):
+        if not replica_reads_enabled.get() or connections['default'].in_atomic_block:
+            return 'default'
+
+        replicas = [alias for alias in settings.DATABASE_REPLICAS if lag_guard.is_fresh(alias)]
+        if not replicas:
+            return 'default'
+
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.DATABASE_REPLICAS
@@ -1,13 +1,18 @@
 import os
 
+from datetime import timedelta
+
 import dj_database_url
 
 from environs import Env
-from git import Repo
 
 env = Env()
 env.read_env(path='../.env/django/.env')
 
+# Ветку и коммит записывает run_deploy.sh при деплое, в Docker их передают аргументами сборки.
+if os.path.exists('../.env/django/build.env'):
+    env.read_env(path='../.env/django/build.env', override=True)
+
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 SECRET_KEY = env.str('SECRET_KEY')
@@ -19,25 +24,27 @@ ALLOWED_HOSTS = env.list('ALLOWED_HOSTS')
 INSTALLED_APPS = [
     'foodcartapp.apps.FoodcartappConfig',
     'restaurateur.apps.RestaurateurConfig',
+    'places.apps.PlacesConfig',
+    'monitoring.apps.MonitoringConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
-    'debug_toolbar',
     'rest_framework',
 ]
 
 MIDDLEWARE = [
+    'monitoring.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'monitoring.middleware.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'debug_toolbar.middleware.DebugToolbarMiddleware',
     'rollbar.contrib.django.middleware.RollbarNotifierMiddlewareExcluding404',
 ]
 
@@ -58,6 +65,13 @@ DEBUG_TOOLBAR_PANELS = [
     'debug_toolbar.panels.redirects.RedirectsPanel',
 ]
 
+if DEBUG:
+    INSTALLED_APPS.append('debug_toolbar')
+    MIDDLEWARE.insert(
+        MIDDLEWARE.index('rollbar.contrib.django.middleware.RollbarNotifierMiddlewareExcluding404'),
+        'debug_toolbar.middleware.DebugToolbarMiddleware',
+    )
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -88,6 +102,20 @@ DATABASES = {
     'default': dj_database_url.parse(DATABASE_URL)
 }
 
+for number, replica_url in enumerate(env.list('DB_REPLICA_URLS', []), start=1):
+    DATABASES[f'replica_{number}'] = {
+        **dj_database_url.parse(replica_url),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+
+DATABASE_ROUTERS = ['star_burger.db_router.ReplicaRouter']
+
+DB_REPLICA_MAX_LAG = env.float('DB_REPLICA_MAX_LAG_SECONDS', 5)
+
+DB_REPLICA_LAG_CHECK_INTERVAL = env.float('DB_REPLICA_LAG_CHECK_INTERVAL_SECONDS', 1)
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -129,10 +157,74 @@ INTERNAL_IPS = [
 
 YANDEX_GEO_API = env.str('YANDEX_GEO_API')
 
+GEOCODER_URL = env.str('GEOCODER_URL', 'https://geocode-maps.yandex.ru/1.x')
+
+GEOCODER_CONNECT_TIMEOUT = env.float('GEOCODER_CONNECT_TIMEOUT', 3.05)
+
+GEOCODER_READ_TIMEOUT = env.float('GEOCODER_READ_TIMEOUT', 5)
+
+GEOCODER_RETRIES = env.int('GEOCODER_RETRIES', 2)
+
+GEOCODER_RATE_LIMIT = env.float('GEOCODER_RATE_LIMIT', 10)
+
+GEOCODER_MAX_WORKERS = env.int('GEOCODER_MAX_WORKERS', 8)
+
+GEOCODER_ASYNC_MAX_CONNECTIONS = env.int('GEOCODER_ASYNC_MAX_CONNECTIONS', 100)
+
+ORDER_GEOCODING_TIMEOUT = env.float('ORDER_GEOCODING_TIMEOUT', 2)
+
+GEOCODER_BREAKER_THRESHOLD = env.int('GEOCODER_BREAKER_THRESHOLD', 5)
+
+GEOCODER_BREAKER_RESET_SECONDS = env.float('GEOCODER_BREAKER_RESET_SECONDS', 30)
+
+GEOCODER_CACHE_SIZE = env.int('GEOCODER_CACHE_SIZE', 1000)
+
+GEOCODER_CACHE_TTL = timedelta(days=env.int('GEOCODER_CACHE_TTL_DAYS', 30))
+
+GEOCODER_NEGATIVE_CACHE_TTL = timedelta(hours=env.int('GEOCODER_NEGATIVE_CACHE_TTL_HOURS', 24))
+
+DELIVERY_JOB_MAX_ATTEMPTS = env.int('DELIVERY_JOB_MAX_ATTEMPTS', 5)
+
+DELIVERY_JOB_RETRY_DELAY = timedelta(seconds=env.int('DELIVERY_JOB_RETRY_DELAY_SECONDS', 30))
+
+DELIVERY_CANDIDATES_LIMIT = env.int('DELIVERY_CANDIDATES_LIMIT', None)
+
+ORDERS_BATCH_MAX_SIZE = env.int('ORDERS_BATCH_MAX_SIZE', 1000)
+
+ORDERS_ARCHIVE_AFTER_DAYS = env.int('ORDERS_ARCHIVE_AFTER_DAYS', 90)
+
+DISPATCH_LOAD_WEIGHT = env.float('DISPATCH_LOAD_WEIGHT', 2)
+
+DISPATCH_RESTAURANT_CAPACITY = env.int('DISPATCH_RESTAURANT_CAPACITY', None)
+
+MANAGER_ORDERS_PAGE_SIZE = env.int('MANAGER_ORDERS_PAGE_SIZE', 50)
+
+ORDER_CHANGES_POLL_INTERVAL = env.int('ORDER_CHANGES_POLL_INTERVAL_SECONDS', 5)
+
+ORDER_CHANGES_SETTLE_SECONDS = env.int('ORDER_CHANGES_SETTLE_SECONDS', 10)
+
+ORDER_CHANGES_LIMIT = 500
+
+CATALOG_CACHE_MAX_AGE = env.int('CATALOG_CACHE_MAX_AGE', 60)
+
+METRICS_DIR = env.str('METRICS_DIR', os.path.join(BASE_DIR, 'metrics'))
+
+METRICS_FLUSH_INTERVAL = env.float('METRICS_FLUSH_INTERVAL_SECONDS', 5)
+
+METRICS_TOKEN = env.str('METRICS_TOKEN', '')
+
+TEST_RUNNER = 'star_burger.test_runner.TestRunner'
+
+PROFILING_DIR = env.str('PROFILING_DIR', os.path.join(BASE_DIR, 'profiles'))
+
+PROFILING_SAMPLE_RATE = env.float('PROFILING_SAMPLE_RATE', 0)
+
+PROFILING_INTERVAL = env.float('PROFILING_INTERVAL_SECONDS', 0.005)
+
 ROLLBAR = {
     'access_token': env.str('ROLLBAR_ACCESS_TOKEN', ''),
-    'branch': Repo(path='../').active_branch.name,
+    'branch': env.str('BUILD_BRANCH', ''),
     'environment': env.str('ROLLBAR_ENVIRONMENT', ''),
-    'code_version': '1.0',
+    'code_version': env.str('BUILD_COMMIT', '1.0'),
     'root': BASE_DIR,
 }
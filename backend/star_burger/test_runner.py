@@ -0,0 +1,23 @@
+from tempfile import TemporaryDirectory
+
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Воркер тестов сохраняет метрики во временный каталог, а не в METRICS_DIR сайта.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+
+        self.metrics_dir = TemporaryDirectory()
+        self.metrics_settings = override_settings(METRICS_DIR=self.metrics_dir.name)
+        self.metrics_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.metrics_settings.disable()
+        self.metrics_dir.cleanup()
+
+        super().teardown_test_environment(**kwargs)
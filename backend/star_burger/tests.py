@@ -0,0 +1,171 @@
+import asyncio
+from decimal import Decimal
+from unittest import skipUnless
+from unittest.mock import MagicMock, patch
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.db.utils import ConnectionDoesNotExist, OperationalError
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from foodcartapp import availability
+from foodcartapp.availability import get_availability_index
+from foodcartapp.models import Product
+from foodcartapp.views import get_catalog_payload
+
+from .db_router import ReplicaRouter, lag_guard, replica_reads, replica_reads_enabled, use_replica
+
+
+class ReplicasTestMixin:
+    """
+    Отставание реплик подменяется, поэтому к псевдонимам fake_replica_1 и fake_replica_2 тесты не подключаются:
+    запрос, по ошибке отправленный на реплику, упадёт с ConnectionDoesNotExist.
+    """
+
+    def setUp(self):
+        super().setUp()
+        replicas_settings = override_settings(DATABASE_REPLICAS=['fake_replica_1', 'fake_replica_2'], DB_REPLICA_MAX_LAG=5)
+        replicas_settings.enable()
+        self.addCleanup(replicas_settings.disable)
+
+        self.router = ReplicaRouter()
+        self.lags = {'fake_replica_1': 0, 'fake_replica_2': 0}
+
+        lag_guard.clear()
+        self.addCleanup(lag_guard.clear)
+
+        get_lag = patch.object(lag_guard, 'get_lag', side_effect=lambda alias: self.lags[alias])
+        self.get_lag = get_lag.start()
+        self.addCleanup(get_lag.stop)
+
+
+class ReplicaRouterTest(ReplicasTestMixin, SimpleTestCase):
+
+    def test_reads_go_to_default_by_default(self):
+        self.assertEqual(self.router.db_for_read(Product), 'default')
+
+    def test_replica_reads(self):
+        with replica_reads():
+            aliases = {self.router.db_for_read(Product) for _ in range(50)}
+            self.assertEqual(self.router.db_for_write(Product), 'default')
+
+        self.assertEqual(aliases, {'fake_replica_1', 'fake_replica_2'})
+
+    def test_lagging_replicas_are_skipped(self):
+        self.lags['fake_replica_1'] = 10
+
+        with replica_reads():
+            self.assertEqual({self.router.db_for_read(Product) for _ in range(20)}, {'fake_replica_2'})
+
+            self.lags['fake_replica_2'] = float('inf')
+            lag_guard.clear()
+            self.assertEqual(self.router.db_for_read(Product), 'default')
+
+    @override_settings(DB_REPLICA_LAG_CHECK_INTERVAL=60)
+    def test_lag_is_checked_once_per_interval(self):
+        with replica_reads():
+            for _ in range(10):
+                self.router.db_for_read(Product)
+
+        self.assertEqual(self.get_lag.call_count, 2)
+
+    def test_reads_in_transactions_go_to_default(self):
+        with replica_reads(), patch.object(connections['default'], 'in_atomic_block', True):
+            self.assertEqual(self.router.db_for_read(Product), 'default')
+
+    def test_use_replica(self):
+        @use_replica
+        def view():
+            return replica_reads_enabled.get()
+
+        @use_replica
+        async def async_view():
+            await asyncio.sleep(0)
+            return replica_reads_enabled.get()
+
+        self.assertTrue(view())
+        self.assertTrue(async_to_sync(async_view)())
+        self.assertFalse(replica_reads_enabled.get())
+
+
+class CachedArtefactsTest(ReplicasTestMixin, TransactionTestCase):
+    """
+    TransactionTestCase не оборачивает тест в транзакцию, поэтому внутри replica_reads
+    обычные запросы действительно уходят на реплики.
+    """
+
+    def setUp(self):
+        super().setUp()
+        availability._index = None
+        cache.clear()
+
+    def tearDown(self):
+        availability._index = None
+        cache.clear()
+        super().tearDown()
+
+    def test_cached_artefacts_are_built_from_default(self):
+        Product.objects.create(name='Бургер', price=100, image='burger.jpg')
+
+        with replica_reads():
+            with self.assertRaises(ConnectionDoesNotExist):
+                list(Product.objects.all())
+
+            get_catalog_payload()
+            get_availability_index()
+
+
+class ReplicaLagTest(SimpleTestCase):
+    def get_lag(self, cursor_result=None, error=None):
+        connection = MagicMock(vendor='postgresql')
+        cursor = connection.cursor.return_value.__enter__.return_value
+        cursor.fetchone.return_value = cursor_result
+        cursor.execute.side_effect = error
+
+        with patch('star_burger.db_router.connections', {'fake_replica_1': connection}):
+            return lag_guard.get_lag('fake_replica_1'), cursor.execute.call_args
+
+    def test_caught_up_replica_is_fresh(self):
+        lag, (query_args, _) = self.get_lag((Decimal('0'),))
+
+        self.assertEqual(lag, 0)
+        # Без записей в основную БД время последней применённой транзакции устаревает,
+        # поэтому догнавшая основную БД реплика определяется по позициям WAL.
+        self.assertIn('pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn()', query_args[0])
+
+    def test_unavailable_replica(self):
+        lag, _ = self.get_lag(error=OperationalError())
+
+        self.assertEqual(lag, float('inf'))
+
+
+@skipUnless(settings.DATABASE_REPLICAS, 'Нужна реплика: DB_REPLICA_URLS=sqlite:////tmp/replica.sqlite3')
+class LocalReplicaTest(TransactionTestCase):
+    """
+    Проверка на двух локальных базах. В тестах реплика зеркалирует основную базу,
+    поэтому закоммиченные данные видны на ней сразу.
+    """
+    databases = '__all__'
+
+    def setUp(self):
+        lag_guard.clear()
+        self.addCleanup(lag_guard.clear)
+
+    def test_replica_reads(self):
+        Product.objects.create(name='Бургер', price=100, image='burger.jpg')
+
+        with override_settings(DATABASE_REPLICAS=settings.DATABASE_REPLICAS[:1]):
+            replica = settings.DATABASE_REPLICAS[0]
+            with CaptureQueriesContext(connections[replica]) as replica_queries, replica_reads():
+                names = list(Product.objects.values_list('name', flat=True))
+
+            with CaptureQueriesContext(connections[replica]) as atomic_replica_queries, replica_reads():
+                with transaction.atomic():
+                    list(Product.objects.all())
+
+        self.assertEqual(names, ['Бургер'])
+        self.assertEqual(len(replica_queries), 1)
+        self.assertEqual(len(atomic_replica_queries), 0)
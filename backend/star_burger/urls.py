@@ -27,6 +27,7 @@ urlpatterns = [
     path('api/', include('foodcartapp.urls')),
     path('manager/', include('restaurateur.urls')),
     path('api-auth/', include('rest_framework.urls')),
+    path('monitoring/', include('monitoring.urls')),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
 
 if settings.DEBUG:
@@ -7,6 +7,9 @@ set -e
 git pull > /dev/null
 echo "DONE git pull"
 
+printf 'BUILD_BRANCH=%s\nBUILD_COMMIT=%s\n' "$(git rev-parse --abbrev-ref HEAD)" "$(git rev-parse HEAD)" > .env/django/build.env
+echo "DONE build info"
+
 source .venv/bin/activate
 echo "DONE activate venv"
 